@@ -1,49 +1,196 @@
 import requests
+import itertools
 import json
 import os
+import random
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Dict, Any, Optional
 import time
+from urllib.parse import urlencode
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from logger_config import get_logger
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # optional: stdlib json is fine, just slower
+    _json_loads = json.loads
+
+try:
+    from requests_toolbelt.multipart.encoder import MultipartEncoder
+except ImportError:  # optional: fall back to requests' in-memory multipart
+    MultipartEncoder = None
+
 logger = get_logger("api_client")
 
+# Offline queue files are named req_<ms>_<seq>_r<retries>.jpg
+MAX_QUEUE_RETRIES = 5
+FLUSH_BATCH_SIZE = 32
+ADMIN_GET_TTL = 1.0  # Seconds an admin GET result is reused
+REPLAY_WORKERS = 4  # Concurrent replays, well under the adapter's pool_maxsize
+REPLAY_MAX_BACKOFF = 60  # Seconds; cap for the replay resume delay after server errors
+_QUEUE_RETRY_RE = re.compile(r"_r(\d+)\.jpg$")
+
+# Returned by recognize_multi when the frame was queued instead of sent
+OFFLINE_QUEUED_RESPONSE = {
+    "status": "offline_queued",
+    "faces": [],
+    "recognized_names": [],
+    "combined_audio": "Sistem sedang offline. Data disimpan dan akan dikirim nanti."
+}
+
+# Strips whitespace, surrounding quotes and a leading "Bearer " in one pass
+_BEARER_RE = re.compile(r'^\s*["\']?\s*(?:bearer\s+)?(.*?)\s*["\']?\s*$', re.IGNORECASE | re.DOTALL)
+
+# Accepted enroll uploads (tuple, since str.endswith needs one)
+VALID_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+def _error_detail(r: requests.Response) -> str:
+    """Extract 'detail' from an error response, decoding the body only once"""
+    body = r.content
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body.decode("utf-8", "replace")
+    if isinstance(data, dict) and "detail" in data:
+        return str(data["detail"])
+    return body.decode("utf-8", "replace")
+
+
+_ERR_MAP = {401: "Invalid credentials", 403: "Forbidden", 404: "Not found", 429: "Rate limited"}
+
+
+def _raise_for(r: requests.Response, messages: dict[int, str] | None = None):
+    """Raise RuntimeError for any 4xx/5xx response; `messages` overrides the base text per status"""
+    code = r.status_code
+    if code < 400:
+        return
+    base = (messages and messages.get(code)) or _ERR_MAP.get(code) or ("Server error" if code >= 500 else "Error")
+    raise RuntimeError(f"{base} ({code}): {_error_detail(r)[:512]}")
+
+
+_LOGIN_ERRORS = {
+    401: "Invalid username or password",
+    429: "Too many login attempts - please wait",
+}
+
+_CREATE_ADMIN_ERRORS = {
+    404: "API belum mendukung create admin. Update API new-api terlebih dahulu (tambahkan endpoint /admin/create_admin).",
+    401: "Tidak diizinkan membuat admin",
+    403: "Tidak diizinkan membuat admin",
+}
+
 
 class ApiClient:
-    def __init__(self, base_url: str, device_id: str, device_token: str, timeout=12.0):
+    def __init__(self, base_url: str, device_id: str, device_token: str, timeout=12.0,
+                 max_frame_bytes: int = 2_000_000):
         self.base_url = base_url.rstrip("/")
         self.device_id = device_id
         self.device_token = device_token
         self.timeout = float(timeout)
+        self.max_frame_bytes = int(max_frame_bytes)  # Frames above this would just fail server-side
 
         self._admin_token: str | None = None
+        self._admin_headers_cached: dict = {}
         self.session = requests.Session()
+
+        # Keep warm connections in the pool and let our own offline logic handle failures
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            pool_block=False,
+            max_retries=Retry(total=0, connect=0, read=0, status=0, respect_retry_after_header=False),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "X-Device-Id": self.device_id,
+            "X-Device-Token": self.device_token,
+            "Connection": "keep-alive",
+            "User-Agent": "AbsensiDesktop/1.0",
+        })
         
         # Connection status tracking for smart reconnection
         self._is_online = True
         self._last_error_time = 0
+        self._last_ok_time = 0.0
         self._consecutive_failures = 0
         self._retry_backoff = 1  # Exponential backoff: 1, 2, 4, 8... seconds
         self._max_backoff = 30   # Max 30 seconds between retries
+        self._replay_backoff = 1  # Offline replay after a 5xx: 1, 2, 4 ... REPLAY_MAX_BACKOFF seconds
+
+        # Offline queue (created once, filenames stay unique under bursts)
+        self._queue_dir = "offline_queue"
+        os.makedirs(self._queue_dir, exist_ok=True)
+        self._queue_seq = itertools.count()
+        self._migrate_legacy_queue()
+
+        # Offline queue drain (single-flight)
+        self._flush_lock = threading.Lock()
+        self._flush_thread: threading.Thread | None = None
+
+        # Short-TTL, single-flight cache for admin GETs (absorbs rapid dashboard refreshes)
+        self._get_cache: dict[str, tuple[float, Future]] = {}
+        self._get_cache_lock = threading.Lock()
+
+        # Warm up a pooled connection so the first frame skips the TCP/TLS handshake
+        threading.Thread(target=self.check_health, daemon=True).start()
     
     @property
     def is_online(self) -> bool:
         """Check if API is currently reachable"""
         return self._is_online
     
-    def check_health(self) -> bool:
-        """Quick health check to API - returns True if online"""
+    @property
+    def offline_queue_size(self) -> int:
+        """Number of frames waiting in the offline queue"""
+        try:
+            with os.scandir(self._queue_dir) as it:
+                return sum(1 for e in it if e.name.endswith(".jpg"))
+        except OSError:
+            return 0
+    
+    def check_health(self, paced: bool = True) -> bool:
+        """Quick health check to API - returns True if online
+
+        paced=False always probes: for callers that run their own backoff timer
+        """
+        # Full-jitter backoff: while offline, skip probes inside a randomized window
+        # so a fleet of devices doesn't hit a recovering server in lockstep
+        if paced and not self._is_online:
+            if time.monotonic() - self._last_error_time < random.uniform(0, self._retry_backoff):
+                return False
         try:
             r = self.session.get(f"{self.base_url}/health", timeout=3)
             if r.status_code == 200:
-                self._is_online = True
-                self._consecutive_failures = 0
-                self._retry_backoff = 1
+                self._mark_online()
                 return True
         except:
             pass
-        self._is_online = False
+        self._mark_offline()
         return False
 
+    @property
+    def last_ok_age(self) -> float:
+        """Seconds since the API last answered successfully"""
+        return time.monotonic() - self._last_ok_time
+
+    def _mark_online(self):
+        self._is_online = True
+        self._last_ok_time = time.monotonic()
+        self._consecutive_failures = 0
+        self._retry_backoff = 1
+
+    def _mark_offline(self):
+        self._is_online = False
+        self._consecutive_failures += 1
+        self._retry_backoff = min(self._retry_backoff * 2, self._max_backoff)
+        self._last_error_time = time.monotonic()
+
     # ---------------- Token (admin) ----------------
     @property
     def admin_token(self) -> str | None:
@@ -54,11 +201,16 @@ class ApiClient:
         """Sanitize token so we never send 'Bearer Bearer ...' or quotes."""
         if not isinstance(v, str):
             self._admin_token = v
+            self._set_auth_header(None)
             return
-        tok = v.strip().strip('"').strip("'")
-        if tok.lower().startswith("bearer "):
-            tok = tok[7:].strip()
+        tok = _BEARER_RE.match(v).group(1)
         self._admin_token = tok
+        self._set_auth_header(tok)
+
+    def _set_auth_header(self, tok: str | None):
+        """Build the admin header once per token change (sent by admin calls only)"""
+        self._invalidate_get_cache()
+        self._admin_headers_cached = {"Authorization": f"Bearer {tok}"} if tok else {}
 
     # alias kompatibilitas (kalau ada code lama)
     @property
@@ -74,27 +226,30 @@ class ApiClient:
     
     def recognize_multi(self, jpg_bytes: bytes) -> dict:
         """Send full frame for multi-face recognition (max 5 faces)"""
-        if not jpg_bytes or len(jpg_bytes) == 0:
+        if not jpg_bytes:
             raise ValueError("Empty image data")
+        if len(jpg_bytes) > self.max_frame_bytes:
+            raise ValueError(f"Frame too large: {len(jpg_bytes)} bytes")
+        
+        # Known-down backend: queue immediately instead of stalling on the TCP timeout
+        if not self._is_online and (time.monotonic() - self._last_error_time) < self._retry_backoff:
+            self._save_to_queue(jpg_bytes)
+            return dict(OFFLINE_QUEUED_RESPONSE)
         
         url = f"{self.base_url}/v1/recognize_multi"
-        headers = {"X-Device-Id": self.device_id, "X-Device-Token": self.device_token}
         files = {"file": ("frame.jpg", jpg_bytes, "image/jpeg")}
 
         try:
             logger.debug(f"Sending multi-face request: {len(jpg_bytes)} bytes")
-            r = self.session.post(url, headers=headers, files=files, timeout=self.timeout)
+            r = self.session.post(url, files=files, timeout=self.timeout)
             
             if r.status_code >= 400:
                 # Server error (but reachable) - do not queue
-                try:
-                    error_data = r.json()
-                    raise RuntimeError(f"API error {r.status_code}: {error_data.get('detail', r.text)}")
-                except json.JSONDecodeError:
-                    raise RuntimeError(f"API error {r.status_code}: {r.text}")
+                raise RuntimeError(f"API error {r.status_code}: {_error_detail(r)}")
             
-            result = r.json()
+            result = _json_loads(r.content)
             logger.debug(f"Multi-face response: {len(result.get('faces', []))} faces")
+            self._mark_online()
             
             # If successful, check if we have queued items to flush
             self._flush_queue_in_background()
@@ -104,112 +259,208 @@ class ApiClient:
         except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
             # OFFLINE DETECTED - QUEUE IT
             logger.warning("Offline detected! Queuing request...")
+            self._mark_offline()
             self._save_to_queue(jpg_bytes)
             # Return empty "success" so app doesn't crash
-            return {
-                "status": "offline_queued",
-                "faces": [],
-                "recognized_names": [],
-                "combined_audio": "Sistem sedang offline. Data disimpan dan akan dikirim nanti."
-            }
+            return dict(OFFLINE_QUEUED_RESPONSE)
         except Exception as e:
             logger.error(f"Unexpected error in recognize_multi: {e}")
             raise
 
     # ---------------- Offline Queue ----------------
     def _save_to_queue(self, jpg_bytes: bytes):
-        """Save failed request to local disk"""
+        """Save failed request to local disk as raw JPEG (retry count lives in the filename)"""
         try:
-            queue_dir = "offline_queue"
-            if not os.path.exists(queue_dir):
-                os.makedirs(queue_dir)
-            
-            import base64
-            from datetime import datetime
-            
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-            filename = f"req_{timestamp}.json"
-            filepath = os.path.join(queue_dir, filename)
-            
-            # Encode image
-            b64_img = base64.b64encode(jpg_bytes).decode('utf-8')
+            # Millisecond timestamp + sequence: sortable (FIFO) and collision-free
+            filename = f"req_{int(time.time() * 1000):013d}_{next(self._queue_seq):06d}_r0.jpg"
+            filepath = os.path.join(self._queue_dir, filename)
             
-            data = {
-                "timestamp": timestamp,
-                "image_b64": b64_img,
-                "retry_count": 0
-            }
-            
-            with open(filepath, 'w') as f:
-                json.dump(data, f)
+            with open(filepath, 'wb', buffering=1 << 20) as f:
+                f.write(jpg_bytes)
             
             logger.info(f"Saved connection request to {filepath}")
         except Exception as e:
             logger.error(f"Failed to save offline queue: {e}")
 
+    def _migrate_legacy_queue(self):
+        """Convert req_*.json (base64) items left by older versions into queued JPEGs, once"""
+        try:
+            with os.scandir(self._queue_dir) as it:
+                legacy = sorted(e.name for e in it if e.name.startswith("req_") and e.name.endswith(".json"))
+        except OSError:
+            return
+        if not legacy:
+            return
+
+        import base64
+        from datetime import datetime
+
+        migrated = 0
+        for filename in legacy:
+            filepath = os.path.join(self._queue_dir, filename)
+            try:
+                with open(filepath, "r") as f:
+                    data = json.load(f)
+                img_bytes = base64.b64decode(data["image_b64"])
+                retries = int(data.get("retry_count", 0))
+                try:
+                    # Keep FIFO order: legacy names carry a local "%Y%m%d_%H%M%S_%f" timestamp
+                    ts_ms = int(datetime.strptime(filename[4:-5], "%Y%m%d_%H%M%S_%f").timestamp() * 1000)
+                except ValueError:
+                    ts_ms = int(os.path.getmtime(filepath) * 1000)
+
+                target = os.path.join(
+                    self._queue_dir, f"req_{ts_ms:013d}_{next(self._queue_seq):06d}_r{retries}.jpg")
+                tmp_path = target + ".part"
+                with open(tmp_path, "wb") as f:
+                    f.write(img_bytes)
+                os.replace(tmp_path, target)
+                os.remove(filepath)
+                migrated += 1
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                # Unreadable item: keep it aside instead of deleting attendance data
+                logger.error(f"Failed to migrate legacy queue file {filename}: {e}")
+                try:
+                    os.replace(filepath, filepath + ".bad")
+                except OSError:
+                    pass
+
+        logger.info(f"Migrated {migrated}/{len(legacy)} legacy offline queue items")
+
+    def _bump_queue_retry(self, filepath: str):
+        """Rename queued file to the next _r{n} segment, or drop it once the cap is reached"""
+        m = _QUEUE_RETRY_RE.search(filepath)
+        retries = int(m.group(1)) + 1 if m else 1
+        try:
+            if retries > MAX_QUEUE_RETRIES:
+                os.remove(filepath)
+                logger.warning(f"Dropped queued item after {MAX_QUEUE_RETRIES} retries: {filepath}")
+            elif m:
+                os.replace(filepath, f"{filepath[:m.start()]}_r{retries}.jpg")
+        except OSError as e:
+            logger.error(f"Failed to update queue file {filepath}: {e}")
+
     def _flush_queue_in_background(self):
-        """Trigger queue flush (simple check, assume threaded elsewhere or quick check)"""
-        # For simplicity, we just check if dir exists and has files
-        # Ideally this should be a separate thread, but let's check count first
-        queue_dir = "offline_queue"
-        if not os.path.exists(queue_dir):
+        """Drain queued items on a daemon thread so the recognition path never blocks on the backlog"""
+        if not self._is_online or self._flush_lock.locked():
             return
-            
-        files = [f for f in os.listdir(queue_dir) if f.endswith(".json")]
-        if not files:
+        
+        queue_dir = self._queue_dir
+        if not os.path.exists(queue_dir):
             return
             
-        # Only start a flush if not already flushing (simple flag needed)
-        # For now, let's just process ONE item per successful request to avoid blocking
-        # or implement a proper background worker in App
-        pass 
+        with os.scandir(queue_dir) as it:
+            if not any(e.name.endswith(".jpg") for e in it):
+                return
         
-    def process_offline_queue(self) -> int:
-        """Process all queued offline requests. Call this from a background thread."""
-        queue_dir = "offline_queue"
+        self._flush_thread = threading.Thread(target=self._drain_queue_worker, daemon=True)
+        self._flush_thread.start()
+
+    def _drain_queue_worker(self):
+        """Background worker: replay one bounded batch, the next successful request picks up the rest"""
+        try:
+            self.process_offline_queue(max_items=FLUSH_BATCH_SIZE)
+        except Exception as e:
+            logger.error(f"Background queue flush failed: {e}")
+        
+    def process_offline_queue(self, max_items: int | None = None) -> int:
+        """Process queued offline requests (all, or up to max_items). Call this from a background thread."""
+        # Single-flight: periodic sync and post-request flush must not replay the same files twice
+        if not self._flush_lock.acquire(blocking=False):
+            return 0
+        try:
+            return self._replay_offline_queue(max_items)
+        finally:
+            self._flush_lock.release()
+
+    def _replay_offline_queue(self, max_items: int | None) -> int:
+        queue_dir = self._queue_dir
         if not os.path.exists(queue_dir):
             return 0
             
-        files = sorted([f for f in os.listdir(queue_dir) if f.endswith(".json")])
-        if not files:
+        with os.scandir(queue_dir) as it:
+            entries = sorted((e for e in it if e.name.endswith(".jpg")), key=lambda e: e.name)
+        if max_items is not None:
+            entries = entries[:max_items]
+        if not entries:
             return 0
         
-        logger.info(f"Processing offline queue: {len(files)} items")
-        processed = 0
+        logger.info(f"Processing offline queue: {len(entries)} items")
         
-        import base64
+        # Fan out over the keep-alive pool; the semaphore keeps submits in FIFO order
+        # and lets us stop feeding the pool as soon as one replay hits a hard error
+        stop = threading.Event()
+        server_error = threading.Event()
+        slots = threading.Semaphore(REPLAY_WORKERS)
+        synced: list[str] = []  # unlinked in one pass once the HTTP batch is done
+        
+        with ThreadPoolExecutor(max_workers=REPLAY_WORKERS, thread_name_prefix="replay") as ex:
+            for entry in entries:
+                slots.acquire()
+                if stop.is_set() or not self._is_online:
+                    slots.release()
+                    break
+                fut = ex.submit(self._replay_one, entry, stop, server_error, synced)
+                fut.add_done_callback(lambda _f: slots.release())
+                # Spread replays out instead of bursting the backlog
+                time.sleep(random.uniform(0, 0.05))
         
-        for filename in files:
-            filepath = os.path.join(queue_dir, filename)
+        if server_error.is_set():
+            # Server is struggling - resume after a backoff that grows until a replay succeeds
+            delay = self._replay_backoff
+            self._replay_backoff = min(delay * 2, REPLAY_MAX_BACKOFF)
+            logger.warning(f"Server error while syncing, retry in {delay}s")
+            resume = threading.Timer(delay, self._flush_queue_in_background)
+            resume.daemon = True
+            resume.start()
+        elif synced:
+            self._replay_backoff = 1
+        
+        for p in synced:
             try:
-                with open(filepath, 'r') as f:
-                    data = json.load(f)
-                
-                img_bytes = base64.b64decode(data["image_b64"])
-                
-                # Send (blocking)
-                url = f"{self.base_url}/v1/recognize_multi"
-                headers = {"X-Device-Id": self.device_id, "X-Device-Token": self.device_token}
-                files_payload = {"file": ("queued_frame.jpg", img_bytes, "image/jpeg")}
-                
-                r = self.session.post(url, headers=headers, files=files_payload, timeout=self.timeout)
-                
-                if r.status_code < 400:
-                    # Success
-                    os.remove(filepath)
-                    processed += 1
-                    logger.info(f"Synced queued item {filename}")
-                else:
-                    logger.warning(f"Failed to sync {filename}: {r.status_code}")
-                    # Keep file, maybe retry later
-                    
-            except Exception as e:
-                logger.error(f"Error processing queue file {filename}: {e}")
-                # If file is corrupt, delete it
-                if "JSONDecodeError" in str(e):
-                    os.remove(filepath)
+                os.unlink(p)
+            except FileNotFoundError:
+                pass
         
-        return processed
+        return len(synced)
+
+    def _replay_one(self, entry: os.DirEntry, stop: threading.Event, server_error: threading.Event,
+                    synced: list[str]):
+        """Replay a single queued frame; on success its path is appended to `synced`"""
+        if stop.is_set():
+            return
+        filename, filepath = entry.name, entry.path
+        try:
+            with open(filepath, 'rb') as f:
+                img_bytes = f.read()
+            
+            url = f"{self.base_url}/v1/recognize_multi"
+            files_payload = {"file": ("queued_frame.jpg", img_bytes, "image/jpeg")}
+            
+            r = self.session.post(url, files=files_payload, timeout=self.timeout)
+            
+            if r.status_code < 400:
+                synced.append(filepath)
+                logger.info(f"Synced queued item {filename}")
+                return
+            if r.status_code >= 500:
+                stop.set()
+                server_error.set()
+                # Counts toward MAX_QUEUE_RETRIES: an item the server always rejects is dropped
+                logger.warning(f"Server error syncing {filename}: {r.status_code}")
+                self._bump_queue_retry(filepath)
+                return
+            logger.warning(f"Failed to sync {filename}: {r.status_code}")
+            self._bump_queue_retry(filepath)
+
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            # Still offline - keep the remaining items untouched for the next sync
+            logger.warning(f"Offline queue sync interrupted: {e}")
+            self._mark_offline()
+            stop.set()
+        except Exception as e:
+            logger.error(f"Error processing queue file {filename}: {e}")
+            self._bump_queue_retry(filepath)
 
     # ---------------- Admin Auth ----------------
     def admin_login(self, username: str, password: str) -> dict:
@@ -230,18 +481,7 @@ class ApiClient:
                 timeout=self.timeout,
             )
             
-            if r.status_code == 401:
-                raise RuntimeError("Invalid username or password")
-            elif r.status_code == 429:
-                raise RuntimeError("Too many login attempts - please wait")
-            elif r.status_code >= 500:
-                raise RuntimeError(f"Server error: {r.status_code}")
-            elif r.status_code >= 400:
-                try:
-                    error_data = r.json()
-                    raise RuntimeError(f"Login error: {error_data.get('detail', r.text)}")
-                except json.JSONDecodeError:
-                    raise RuntimeError(f"Login error: {r.text}")
+            _raise_for(r, _LOGIN_ERRORS)
 
             data = r.json()
             token = data.get("access_token") or data.get("token") or data.get("jwt")
@@ -263,63 +503,143 @@ class ApiClient:
             raise
 
     def _admin_headers(self) -> dict:
-        if not self.admin_token:
-            return {}
-        return {"Authorization": f"Bearer {self.admin_token}"}
+        return self._admin_headers_cached
 
     def _admin_request(self, method: str, path: str, **kwargs):
         if not self.admin_token:
             raise RuntimeError("Belum login admin.")
 
-        url = f"{self.base_url}{path}"
-
-        headers = kwargs.pop("headers", {}) or {}
-        headers = {**headers, **self._admin_headers()}
+        # Admin credentials go on admin calls only - the shared session also
+        # carries device traffic (recognize, offline replay, /health)
+        headers = kwargs.pop("headers", None)
+        headers = {**headers, **self._admin_headers_cached} if headers else self._admin_headers_cached
 
         # ✅ fix timeout dobel: kalau caller passing timeout, pakai itu
         timeout = kwargs.pop("timeout", self.timeout)
 
-        r = self.session.request(method, url, headers=headers, timeout=timeout, **kwargs)
-        if r.status_code >= 400:
-            raise RuntimeError(f"{r.status_code} {r.text}")
+        if method != "GET":
+            # Any write can change persons/events/reports - never serve stale reads after it
+            self._invalidate_get_cache()
+
+        r = self.session.request(method, f"{self.base_url}{path}", headers=headers, timeout=timeout, **kwargs)
+        _raise_for(r)
         return r
 
+    def _admin_json(self, method: str, path: str, **kwargs):
+        return _json_loads(self._admin_request(method, path, **kwargs).content)
+
+    def _cached_get(self, path: str, ttl: float = ADMIN_GET_TTL):
+        """GET `path` as JSON, sharing one in-flight request and its result for `ttl` seconds"""
+        now = time.monotonic()
+        with self._get_cache_lock:
+            hit = self._get_cache.get(path)
+            if hit and (not hit[1].done() or hit[0] > now):
+                fut, owner = hit[1], False
+            else:
+                fut, owner = Future(), True
+                self._get_cache[path] = (now + ttl, fut)
+
+        if owner:
+            try:
+                fut.set_result(self._admin_json("GET", path))
+                with self._get_cache_lock:
+                    if self._get_cache.get(path, (0, None))[1] is fut:
+                        self._get_cache[path] = (time.monotonic() + ttl, fut)
+            except Exception as e:
+                fut.set_exception(e)
+                with self._get_cache_lock:
+                    if self._get_cache.get(path, (0, None))[1] is fut:
+                        del self._get_cache[path]
+        return fut.result()
+
+    def _invalidate_get_cache(self):
+        with self._get_cache_lock:
+            self._get_cache.clear()
+
+    def reconfigure(self, base_url: str | None = None, device_id: str | None = None):
+        """Point the client at a new API / device in place (session and pool are kept)"""
+        if base_url:
+            self.base_url = base_url.rstrip("/")
+            # New server: nothing is known yet - drop the old server's offline/backoff state
+            self._last_ok_time = 0.0
+            self._is_online = True
+            self._consecutive_failures = 0
+            self._retry_backoff = 1
+            self._replay_backoff = 1
+            self._last_error_time = 0
+            # The admin token was issued by the old server - never send it to the new one
+            self.admin_token = None
+        if device_id:
+            self.device_id = device_id
+            self.session.headers["X-Device-Id"] = device_id
+        self._invalidate_get_cache()  # Cached reads belong to the old server/device
+
     # ---------------- Admin Endpoints ----------------
     def admin_list_persons(self) -> list[dict]:
-        return self._admin_request("GET", "/admin/persons").json()
+        return self._cached_get("/admin/persons")
 
     def admin_create_person(self, name: str) -> dict:
-        return self._admin_request("POST", "/admin/persons", json={"name": name}).json()
+        return self._admin_json("POST", "/admin/persons", json={"name": name})
 
     def admin_delete_person(self, person_id: int) -> dict:
         """Delete a person by ID"""
         if not isinstance(person_id, int) or person_id <= 0:
             raise ValueError("Invalid person ID")
-        return self._admin_request("DELETE", f"/admin/persons/{person_id}").json()
+        return self._admin_json("DELETE", f"/admin/persons/{person_id}")
 
     def admin_monthly_report(self, month: str) -> dict:
         """Get monthly attendance report"""
-        return self._admin_request("GET", f"/admin/reports/monthly?month={month}").json()
+        return self._cached_get(f"/admin/reports/monthly?month={month}")
+
+    def admin_export_csv(self, dest_path: str, month: str | None = None) -> int:
+        """Stream the attendance CSV export to `dest_path`, return bytes written"""
+        params = {"month": month} if month else None
+        tmp_path = dest_path + ".part"
+        written = 0
+        with self._admin_request("GET", "/admin/reports/export/csv", params=params,
+                                 stream=True, timeout=60) as r:
+            # Server already sends UTF-8 - write bytes as-is, 64 KB at a time
+            with open(tmp_path, "wb") as f:
+                for chunk in r.iter_content(chunk_size=64 * 1024):
+                    f.write(chunk)
+                    written += len(chunk)
+        os.replace(tmp_path, dest_path)
+        return written
 
     def admin_list_events(self, limit=50, offset=0, status=None, name=None, day=None, device_id=None) -> list[dict]:
         """Get attendance events with optional filters"""
-        params = []
-        if limit:
-            params.append(f"limit={limit}")
-        if offset:
-            params.append(f"offset={offset}")
-        if status:
-            params.append(f"status={status}")
-        if name:
-            params.append(f"name={name}")
-        if day:
-            params.append(f"day={day}")
-        if device_id:
-            params.append(f"device_id={device_id}")
-        
-        query_string = "&".join(params) if params else ""
-        url = f"/admin/events{f'?{query_string}' if query_string else ''}"
-        return self._admin_request("GET", url).json()
+        params = {
+            k: v for k, v in (
+                ("limit", limit), ("offset", offset), ("status", status),
+                ("name", name), ("day", day), ("device_id", device_id),
+            ) if v
+        }
+        qs = urlencode(params)
+        path = f"/admin/events?{qs}" if qs else "/admin/events"
+        return self._cached_get(path)
+
+    def admin_dashboard_bundle(self, month: str | None = None, events_limit: int = 50) -> dict:
+        """Fetch persons, latest events and (optionally) the monthly report concurrently.
+
+        Each call runs on its own pooled keep-alive connection, so the total wait is
+        roughly the slowest request instead of the sum of all three.
+        """
+        if not self.admin_token:
+            raise RuntimeError("Belum login admin.")
+
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix="dashboard") as ex:
+            persons = ex.submit(self.admin_list_persons)
+            events = ex.submit(self.admin_list_events, limit=events_limit)
+            report = ex.submit(self.admin_monthly_report, month) if month else None
+
+            bundle = {"persons": persons.result(), "events": events.result(), "report": None}
+            if report is not None:
+                try:
+                    bundle["report"] = report.result()
+                except Exception as e:
+                    # Report is optional here - persons/events still make a usable dashboard
+                    logger.warning(f"Dashboard report for {month} failed: {e}")
+            return bundle
 
     def admin_enroll_person(self, person_id: int, image_paths: list[str]) -> dict:
         """Enroll person with improved file validation and error handling"""
@@ -345,33 +665,27 @@ class ApiClient:
                 if ".." in path or path.startswith("/") or ":" not in path:
                     raise ValueError(f"Invalid file path: {path}")
                 
-                if not os.path.exists(path):
+                # Check file extension
+                if not path.lower().endswith(VALID_IMAGE_EXTENSIONS):
+                    raise ValueError(f"Invalid image format: {path}")
+                
+                # Open first, then size the open descriptor (no exists/getsize race)
+                try:
+                    f = open(path, 'rb', buffering=1 << 16)
+                except FileNotFoundError:
                     raise FileNotFoundError(f"Image file not found: {path}")
+                opened_files.append(f)
                 
                 # Check file size (max 5MB per image)
-                file_size = os.path.getsize(path)
+                file_size = os.fstat(f.fileno()).st_size
                 if file_size > 5 * 1024 * 1024:
                     raise ValueError(f"Image too large: {path} ({file_size} bytes)")
                 
-                # Check file extension
-                valid_extensions = ('.jpg', '.jpeg', '.png', '.webp')
-                if not path.lower().endswith(valid_extensions):
-                    raise ValueError(f"Invalid image format: {path}")
-                
-                f = open(path, 'rb')
-                opened_files.append(f)
-                
                 filename = os.path.basename(path)
                 files.append(("files", (filename, f, "image/jpeg")))
             
             logger.info(f"Enrolling person {person_id} with {len(image_paths)} images")
-            
-            return self._admin_request(
-                "POST",
-                f"/admin/persons/{person_id}/enroll",
-                files=files,
-                timeout=120,
-            ).json()
+            return self._post_enroll(person_id, files)
             
         except Exception as e:
             logger.error(f"Error enrolling person {person_id}: {str(e)}")
@@ -384,13 +698,59 @@ class ApiClient:
                 except Exception as close_error:
                     logger.warning(f"Error closing file: {close_error}")
 
+    def admin_enroll_person_bytes(self, person_id: int, images: list[bytes]) -> dict:
+        """Enroll person from in-memory JPEG bytes (one multipart POST, no temp files)"""
+        if not images:
+            raise ValueError("No images provided")
+        
+        if len(images) > 10:  # Limit to 10 images
+            raise ValueError("Too many images - maximum 10 allowed")
+        
+        if not isinstance(person_id, int) or person_id <= 0:
+            raise ValueError("Invalid person ID")
+        
+        files = []
+        for i, data in enumerate(images):
+            if not data:
+                raise ValueError(f"Empty image at index {i}")
+            if len(data) > 5 * 1024 * 1024:
+                raise ValueError(f"Image too large at index {i} ({len(data)} bytes)")
+            files.append(("files", (f"capture_{i+1}.jpg", data, "image/jpeg")))
+        
+        try:
+            logger.info(f"Enrolling person {person_id} with {len(images)} captured images")
+            return self._post_enroll(person_id, files)
+        except Exception as e:
+            logger.error(f"Error enrolling person {person_id}: {str(e)}")
+            raise
+
+    def _post_enroll(self, person_id: int, files: list) -> dict:
+        """POST prepared multipart `files` to the enroll endpoint"""
+        if MultipartEncoder is not None:
+            # Stream the multipart body chunk by chunk instead of building it in memory
+            enc = MultipartEncoder(fields=files)
+            return self._admin_json(
+                "POST",
+                f"/admin/persons/{person_id}/enroll",
+                data=enc,
+                headers={"Content-Type": enc.content_type},
+                timeout=120,
+            )
+        
+        return self._admin_json(
+            "POST",
+            f"/admin/persons/{person_id}/enroll",
+            files=files,
+            timeout=120,
+        )
+
     def admin_rebuild_cache(self) -> dict:
         # rebuild bisa agak lama
-        return self._admin_request("POST", "/admin/rebuild_cache", timeout=120).json()
+        return self._admin_json("POST", "/admin/rebuild_cache", timeout=120)
 
     def admin_reset_attendance(self) -> dict:
         """Reset all attendance data (for demo)"""
-        return self._admin_request("POST", "/admin/reset_attendance").json()
+        return self._admin_json("POST", "/admin/reset_attendance")
 
     def admin_create_admin(self, username: str, password: str, setup_token: str | None = None) -> dict:
         """Create admin user.
@@ -409,8 +769,7 @@ class ApiClient:
         headers: dict[str, str] = {"Content-Type": "application/json"}
         if setup_token:
             headers["X-Setup-Token"] = setup_token.strip()
-        if self.admin_token:
-            headers["Authorization"] = f"Bearer {self.admin_token}"
+        headers.update(self._admin_headers_cached)
 
         payload = {"username": username, "password": password}
 
@@ -418,24 +777,7 @@ class ApiClient:
             logger.info(f"Create admin attempt: {username}")
             r = self.session.post(url, headers=headers, json=payload, timeout=self.timeout)
 
-            if r.status_code == 404:
-                raise RuntimeError(
-                    "API belum mendukung create admin. Update API new-api terlebih dahulu (tambahkan endpoint /admin/create_admin)."
-                )
-            if r.status_code in (401, 403):
-                try:
-                    err = r.json().get("detail")
-                except Exception:
-                    err = r.text
-                raise RuntimeError(f"Tidak diizinkan membuat admin: {err}")
-            if r.status_code >= 500:
-                raise RuntimeError(f"Server error: {r.status_code}")
-            if r.status_code >= 400:
-                try:
-                    err = r.json().get("detail")
-                except Exception:
-                    err = r.text
-                raise RuntimeError(f"Create admin error {r.status_code}: {err}")
+            _raise_for(r, _CREATE_ADMIN_ERRORS)
 
             return r.json() if r.content else {"ok": True}
         except requests.exceptions.Timeout:
@@ -3,41 +3,93 @@ Absensi Desktop App - Main Application
 Modern face attendance kiosk with admin dashboard
 """
 import os
+import random
 import time
+import zlib
+import statistics
 import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 import cv2
-import queue
+import numpy as np
 import sys
-from dotenv import load_dotenv
+from urllib.parse import urlparse
+from dotenv import load_dotenv, find_dotenv, set_key
 
 # Fix dotenv loading for frozen app
 if getattr(sys, 'frozen', False):
     # If frozen, look for .env in the same folder as the executable
     app_dir = os.path.dirname(sys.executable)
-    env_path = os.path.join(app_dir, '.env')
-    load_dotenv(env_path)
+    ENV_PATH = os.path.join(app_dir, '.env')
+    load_dotenv(ENV_PATH)
 else:
+    ENV_PATH = find_dotenv() or os.path.abspath('.env')
     load_dotenv()
 
-from PySide6.QtWidgets import QApplication, QTableWidgetItem, QMessageBox
-from PySide6.QtCore import QTimer, Qt
-from PySide6.QtGui import QImage, QPixmap, QIcon
+from PySide6.QtWidgets import QApplication, QListWidgetItem, QMessageBox, QFileDialog, QDialog
+from PySide6.QtCore import QTimer, Qt, QObject, Signal
+from PySide6.QtGui import QImage, QPixmap, QIcon, QStandardItemModel, QStandardItem
 
-from ui import MainUI
+from ui import MainUI, CameraCaptureDialog
 from camera import CameraFaceCropper
 from api_client import ApiClient
 from tts_engine import TTSEngine, TTSConfig
 from logger_config import get_logger
-from logger_config import get_logger
 
 logger = get_logger("app")
 
+try:
+    from numba import njit
+except ImportError:  # optional: the overlay kernels run as plain NumPy slicing
+    njit = None
 
-def resource_path(relative_path):
-    """ Get absolute path to resource, works for dev and for PyInstaller """
+
+def _jit(fn):
+    """numba-compile an overlay kernel when numba is installed, else return it as-is"""
+    if njit is None:
+        return fn
+    # Frozen builds ship no .py files, and numba's on-disk cache needs them
+    if not getattr(sys, "frozen", False):
+        try:
+            return njit(cache=True)(fn)
+        except RuntimeError:  # "cannot cache function ...: no locator available"
+            pass
+    return njit(fn)
+
+KIOSK_TAB = 1  # Index of the kiosk tab in MainUI.tabs
+
+# STATUS COLORS (BGR format) for face boxes
+COLOR_SCANNING = (255, 255, 255)  # White - scanning/no match yet
+COLOR_VERIFYING = (0, 255, 255)   # Yellow - API request in flight
+COLOR_RECOGNIZED = (0, 255, 0)    # Green - recognized
+COLOR_UNKNOWN = (0, 0, 255)       # Red - unknown face
+
+# Combined greeting phrasing (filled with waktu + names)
+GREETING_OUT = "Terima kasih {names}. Hati-hati di jalan, sampai jumpa besok!"
+GREETING_LATE = "Selamat {waktu} {names}. Absensi masuk sudah tercatat, tapi jangan terlambat lagi ya."
+GREETING_OK = "Selamat {waktu} {names}. Absensi berhasil. Selamat beraktivitas!"
+
+# Event timestamps come from the API in UTC; kiosk shows WIB
+WIB = timezone(timedelta(hours=7))
+
+# Face-level signature: a new person in the same spot must never match the old one
+FACE_HASH_SIZE = 16       # Per-face average hash side (256 bits)
+FACE_MATCH_MAX_BITS = 24  # Hamming distance (of 256) still "same face"
+FACE_MATCH_MIN_IOU = 0.6  # Boxes must overlap this much
+
+# Health check polling (ms): steady when online, exponential backoff when offline
+HEALTH_ONLINE_MS = 30000
+HEALTH_OFFLINE_MS = 10000
+HEALTH_MAX_MS = 300000
+
+
+def _resolve_base_path():
+    """Resource root for dev and for PyInstaller (resolved once at import)"""
     try:
         # PyInstaller onefile
-        base_path = sys._MEIPASS
+        return sys._MEIPASS
     except Exception:
         # PyInstaller onedir or Dev
         base_path = os.path.abspath(".")
@@ -46,8 +98,23 @@ def resource_path(relative_path):
         internal_path = os.path.join(base_path, "_internal")
         if os.path.exists(internal_path):
             base_path = internal_path
+        return base_path
+
+
+_BASE_PATH = _resolve_base_path()
+
+
+@lru_cache(maxsize=None)
+def resource_path(relative_path):
+    """ Get absolute path to resource, works for dev and for PyInstaller """
+    return os.path.join(_BASE_PATH, relative_path)
+
 
-    return os.path.join(base_path, relative_path)
+@lru_cache(maxsize=None)
+def load_icon(relative_path):
+    """QIcon for a bundled asset (None if missing), created once per path"""
+    path = resource_path(relative_path)
+    return QIcon(path) if os.path.exists(path) else None
 
 
 def bgr_to_qpixmap(frame_bgr):
@@ -55,15 +122,131 @@ def bgr_to_qpixmap(frame_bgr):
     if frame_bgr is None:
         return None
     try:
+        if not frame_bgr.flags["C_CONTIGUOUS"]:
+            frame_bgr = np.ascontiguousarray(frame_bgr)  # e.g. sliced/flipped views
         h, w, ch = frame_bgr.shape
-        rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
-        img = QImage(rgb.data, w, h, ch * w, QImage.Format_RGB888)
+        # Qt reads BGR directly - no per-frame RGB copy. fromImage() copies the
+        # pixels into the pixmap, so the QImage view never outlives frame_bgr.
+        img = QImage(frame_bgr.data, w, h, frame_bgr.strides[0], QImage.Format_BGR888)
         return QPixmap.fromImage(img)
     except Exception as e:
         logger.error(f"Frame conversion error: {e}")
         return None
 
 
+@_jit
+def _fill_rect(frame, x1, y1, x2, y2, color):
+    """Opaque rectangle [x1, x2) x [y1, y2) as one slice assignment"""
+    frame[max(0, y1):max(0, y2), max(0, x1):max(0, x2)] = color
+
+
+@_jit
+def draw_face_boxes(frame, boxes, colors, corner_len=15):
+    """All face boxes in one call: boxes is (n, 5) int32 [x1, y1, x2, y2, scan_y or -1]
+
+    3px bounding box + 4px corner accents (same look as cv2.rectangle/line),
+    plus the 2px scan line when scan_y >= 0.
+    """
+    for i in range(boxes.shape[0]):
+        x1, y1, x2, y2, scan_y = boxes[i, 0], boxes[i, 1], boxes[i, 2], boxes[i, 3], boxes[i, 4]
+        color = colors[i]
+        _fill_rect(frame, x1 - 1, y1 - 1, x2 + 2, y1 + 2, color)  # Top
+        _fill_rect(frame, x1 - 1, y2 - 1, x2 + 2, y2 + 2, color)  # Bottom
+        _fill_rect(frame, x1 - 1, y1 - 1, x1 + 2, y2 + 2, color)  # Left
+        _fill_rect(frame, x2 - 1, y1 - 1, x2 + 2, y2 + 2, color)  # Right
+        for k in range(4):
+            cx = x1 if k < 2 else x2
+            dx = corner_len if k < 2 else -corner_len
+            cy = y1 if k % 2 == 0 else y2
+            dy = corner_len if k % 2 == 0 else -corner_len
+            _fill_rect(frame, min(cx, cx + dx), cy - 2, max(cx, cx + dx) + 1, cy + 2, color)
+            _fill_rect(frame, cx - 2, min(cy, cy + dy), cx + 2, max(cy, cy + dy) + 1, color)
+        if scan_y >= 0:
+            _fill_rect(frame, x1 + 3, scan_y - 1, x2 - 2, scan_y + 1, color)
+
+
+def time_of_day(hour):
+    """Hour (0-23) -> pagi / siang / sore / malam"""
+    if hour < 10:
+        return "pagi"
+    if hour < 15:
+        return "siang"
+    if hour < 18:
+        return "sore"
+    return "malam"
+
+
+def format_wib_time(ts_raw):
+    """ISO timestamp (UTC) -> 'HH:MM:SS' in WIB"""
+    if not ts_raw:
+        return ""
+    try:
+        dt = datetime.fromisoformat(ts_raw.replace("Z", "+00:00"))
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)  # API sends naive UTC
+        return dt.astimezone(WIB).strftime("%H:%M:%S")
+    except ValueError:
+        return ts_raw[:8]  # Fallback
+
+
+def _fill_table(view, rows):
+    """Replace table contents by swapping in a detached, pre-filled model"""
+    old_model, old_selection = view.model(), view.selectionModel()
+    headers = [old_model.headerData(c, Qt.Horizontal) for c in range(old_model.columnCount())]
+    
+    # Not attached to a view yet: filling emits no per-cell view updates
+    model = QStandardItemModel(len(rows), len(headers))
+    model.setHorizontalHeaderLabels(headers)
+    item, set_item = QStandardItem, model.setItem  # Local binds for the hot loop
+    for r, values in enumerate(rows):
+        for c, value in enumerate(values):
+            # API nulls (day, status, person_name...) would make QStandardItem raise
+            set_item(r, c, item("" if value is None else str(value)))
+    
+    view.setModel(model)
+    model.setParent(view)
+    old_selection.deleteLater()  # setModel() leaves the old ones alive
+    old_model.deleteLater()
+
+
+def face_signature(faces):
+    """Per-face (average hash of the crop, bbox), left to right as detected"""
+    sig = []
+    for face in faces:
+        small = cv2.resize(face["crop"], (FACE_HASH_SIZE, FACE_HASH_SIZE), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        sig.append((int.from_bytes(np.packbits(gray > gray.mean()).tobytes(), "big"), tuple(face["bbox"])))
+    return tuple(sig)
+
+
+def _iou(a, b):
+    """Intersection over union of two (x1, y1, x2, y2) boxes"""
+    iw = min(a[2], b[2]) - max(a[0], b[0])
+    ih = min(a[3], b[3]) - max(a[1], b[1])
+    if iw <= 0 or ih <= 0:
+        return 0.0
+    inter = iw * ih
+    return inter / ((a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter)
+
+
+def same_faces(a, b):
+    """Same faces in the same places: count, crop hashes and boxes all match"""
+    if not a or not b or len(a) != len(b):
+        return False
+    for (hash_a, box_a), (hash_b, box_b) in zip(a, b):
+        if bin(hash_a ^ hash_b).count("1") > FACE_MATCH_MAX_BITS or _iou(box_a, box_b) < FACE_MATCH_MIN_IOU:
+            return False
+    return True
+
+
+class _Signals(QObject):
+    """Worker thread -> GUI thread bridge (Qt queues the call across threads)"""
+    result_multi = Signal(object)
+    error = Signal(str)
+    frame_ready = Signal()
+    connection_status = Signal(object)
+
+
 class DesktopApp:
     """Main application controller"""
     
@@ -80,9 +263,18 @@ class DesktopApp:
         self.device_token = (os.getenv("DEVICE_TOKEN") or "87654321").strip()
         self.cam_index = int(os.getenv("CAM_INDEX", "0"))
         self.request_interval = float(os.getenv("REQUEST_INTERVAL", "1.5"))
+        # Adaptive interval: follows measured API latency, clamped to [min, max]
+        self.interval_min = float(os.getenv("REQUEST_INTERVAL_MIN", "0.2"))
+        self.interval_max = float(os.getenv("REQUEST_INTERVAL_MAX", "5.0"))
+        self._api_ema = None
+        # Faces per /recognize/multi call (1 RTT per frame, capped to bound payload)
+        self.max_faces = max(1, min(8, int(os.getenv("MAX_FACES", "5"))))
+        # Upload frame: longest side in px and JPEG quality (server detects faces itself)
+        self.recog_input_size = int(os.getenv("RECOG_INPUT_SIZE", "800"))
+        self.recog_jpeg_quality = int(os.getenv("RECOG_JPEG_QUALITY", "85"))
         
         voice = os.getenv("EDGE_VOICE", "id-ID-GadisNeural")
-        max_fps = int(os.getenv("MAX_FPS", "30"))
+        self.max_fps = max(1, int(os.getenv("MAX_FPS", "30")))
         api_timeout = float(os.getenv("API_TIMEOUT", "15"))
         
         logger.info(f"Config: API={self.api_base}, Device={self.device_id}, Token={self.device_token[:4]}***")
@@ -92,9 +284,9 @@ class DesktopApp:
         self.ui = MainUI()
         
         # Set App Icon
-        icon_path = resource_path("assets/icon.ico")
-        if os.path.exists(icon_path):
-            self.ui.setWindowIcon(QIcon(icon_path))
+        icon = load_icon("assets/icon.ico")
+        if icon:
+            self.ui.setWindowIcon(icon)
         
         self.cam = CameraFaceCropper(self.cam_index) # Initialize camera once, but don't open yet
         self.client = ApiClient(self.api_base, self.device_id, self.device_token, timeout=api_timeout)
@@ -104,39 +296,74 @@ class DesktopApp:
         self.running = False
         self.camera_active = False
         self.last_sent = 0.0
-        self._request_inflight = False
         self._lock = threading.Lock()
+        # Up to MAX_INFLIGHT recognitions at once (count is for the box labels)
+        self.max_inflight = max(1, int(os.getenv("MAX_INFLIGHT", "2")))
+        self._inflight_sem = threading.BoundedSemaphore(self.max_inflight)
+        self._inflight_count = 0
+        # Persistent recognition workers (ApiClient session keeps connections alive)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_inflight, thread_name_prefix="recognize")
+        self._upload_local = threading.local()  # Per-worker resize buffer
+        # Background sync/health calls share one worker (no thread per tick)
+        self._io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="io")
+        self._sync_future = None
+        self._health_future = None
+        self._offline_retries = 0  # Health check backoff step (io worker only)
         self._scan_line_offset = 0  # For animated scanning line
         
-        # Thread-safe result queue
-
-        self._result_queue = queue.Queue()
+        # Preview buffer (reused across ticks, rebuilt only on resize)
+        self._preview_buf = None
+        self._preview_key = None
+        self._last_frame_key = None  # (crc, widget size) of the last shown frame
+        self._kiosk_visible = self.ui.tabs.currentIndex() == KIOSK_TAB
         
-
+        # Thread-safe result delivery (replaces the polled result queue)
+        self._signals = _Signals()
         
         # Multi-face pending greeting (collect faces, trigger after 1.5s of no new faces)
         self._last_faces = {}     # Stores last recognition result per queue_id
         self._pending_faces = []  # Collected recognized faces
+        self._pending_names = set()  # Names in _pending_faces (O(1) dedup)
         self._last_face_time = 0.0
 
         self._greeting_triggered = False
         self.GREETING_DELAY = 1.5  # seconds
         
-        # Stats
-        self.stats = {"checkin": 0, "checkout": 0, "late": 0, "unknown": 0}
+        # Duplicate skip: the same faces in the same places within the window are not re-sent
+        self._last_sig = None
+        self._last_sig_time = 0.0
+        self.DUPLICATE_WINDOW = 5.0  # seconds
+        
+        # Recent recognition results keyed by face signature (LRU + TTL), used only
+        # to paint labels early - every non-duplicate frame is still sent
+        self._result_cache = OrderedDict()
+        self.RESULT_CACHE_SIZE = 256
+        self.RESULT_CACHE_TTL = 30.0  # seconds
+        
+        # Stats (plain int slots; `stats` property gives the dict view)
+        self._checkin = self._checkout = self._late = 0
+        self._total_registered = 0
+        
+        # Pipeline metrics (logged every 30 sec, counters reset per window)
+        self._metrics = {"ticks": 0, "frames_dropped": 0, "requests": 0, "cache_hits": 0,
+                         "reco_latency_ms": deque(maxlen=128)}
+        self._metrics_since = time.monotonic()
         
         # Connect signals
         self._connect_signals()
         
         # Camera timer
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.tick)
-        self.timer.start(1000 // max_fps)
-        
-        # Result processing timer (check every 100ms)
-        self.result_timer = QTimer()
-        self.result_timer.timeout.connect(self._process_result_queue)
-        self.result_timer.start(100)
+        # Camera producer thread -> tick() on the GUI thread (latest frame only)
+        self._latest_frame = None
+        self._frame_lock = threading.Lock()
+        self._capture_stop = threading.Event()
+        self._capture_thread = None
+        
+        # Adaptive FPS: full rate while faces are present, IDLE_FPS after IDLE_AFTER s without
+        self.IDLE_FPS = 5
+        self.IDLE_AFTER = 2.0  # seconds
+        self._frame_interval = 1.0 / self.max_fps
+        self._last_face_seen = 0.0
         
         # Greeting delay timer (check every 500ms)
         self.greeting_timer = QTimer()
@@ -158,6 +385,10 @@ class DesktopApp:
         self.health_timer.timeout.connect(self._check_connection_health)
         self.health_timer.start(self._health_check_interval)
         
+        self.metrics_timer = QTimer()
+        self.metrics_timer.timeout.connect(self._log_metrics)
+        self.metrics_timer.start(30000)
+        
         logger.info("App initialized successfully")
     
     def _connect_signals(self):
@@ -189,6 +420,18 @@ class DesktopApp:
         self.ui.btn_export_csv.clicked.connect(self.export_csv)
         
         self.ui.btn_refresh_stats.clicked.connect(self.refresh_stats)
+        self.ui.tabs.currentChanged.connect(self._on_tab_changed)
+        
+        # Settings: explicit Save (or Enter) applies in place and persists to .env
+        self.ui.btn_save_settings.clicked.connect(self.apply_settings)
+        self.ui.api_url.returnPressed.connect(self.apply_settings)
+        self.ui.device_id.returnPressed.connect(self.apply_settings)
+        
+        # Worker results (emitted from background threads)
+        self._signals.frame_ready.connect(self.tick, Qt.QueuedConnection)
+        self._signals.result_multi.connect(self._handle_multi_result, Qt.QueuedConnection)
+        self._signals.error.connect(self._handle_error, Qt.QueuedConnection)
+        self._signals.connection_status.connect(self._handle_connection_status, Qt.QueuedConnection)
         
         logger.debug("Signals connected")
     
@@ -204,6 +447,7 @@ class DesktopApp:
                 try:
                     self.cam.open(self.cam_index)
                     self.camera_active = True
+                    self._start_capture()
                     logger.info("Camera started")
                 except Exception as e:
                     self.ui.error("Camera", f"Gagal membuka kamera: {e}")
@@ -218,6 +462,7 @@ class DesktopApp:
         else:
             # Stop camera to free resource
             if self.camera_active and self.cam:
+                self._stop_capture()
                 self.cam.release()
                 self.camera_active = False
                 logger.info("Camera stopped")
@@ -228,6 +473,50 @@ class DesktopApp:
             self.ui.btn_toggle.setStyleSheet("background: #10B981;")
             self.ui.set_badge("Silakan absen...", "idle")
             self.ui.video.setText("📷 Klik Mulai untuk scan")
+            self._last_frame_key = None
+    
+    def _start_capture(self):
+        """Start the camera producer thread"""
+        if self._capture_thread and self._capture_thread.is_alive():
+            return
+        self._capture_stop.clear()
+        self._capture_thread = threading.Thread(target=self._capture_loop, name="capture", daemon=True)
+        self._capture_thread.start()
+    
+    def _stop_capture(self):
+        """Stop the producer thread before the camera is released"""
+        self._capture_stop.set()
+        if self._capture_thread:
+            self._capture_thread.join(timeout=1.0)
+            self._capture_thread = None
+        with self._frame_lock:
+            self._latest_frame = None
+    
+    def _capture_loop(self):
+        """Read frames off the GUI thread; keep only the newest (drop-old)"""
+        while not self._capture_stop.is_set():
+            started = time.monotonic()
+            frame = self.cam.read_frame()
+            if frame is None:
+                self._metrics["frames_dropped"] += 1
+                self._capture_stop.wait(0.05)
+                continue
+            with self._frame_lock:
+                notify = self._latest_frame is None
+                if not notify:
+                    self._metrics["frames_dropped"] += 1  # GUI still busy with the last one
+                self._latest_frame = frame
+            if notify:
+                self._signals.frame_ready.emit()
+            rest = self._frame_interval - (time.monotonic() - started)
+            if rest > 0:
+                self._capture_stop.wait(rest)
+    
+    def _on_tab_changed(self, index):
+        """Skip preview rendering while the kiosk tab is hidden"""
+        self._kiosk_visible = index == KIOSK_TAB
+        if self._kiosk_visible:
+            self._last_frame_key = None  # Force a repaint on return
     
     def toggle_mirror(self):
         """Toggle camera mirror mode"""
@@ -237,7 +526,11 @@ class DesktopApp:
     def flip_camera(self):
         """Switch to next camera"""
         try:
+            current = self.cam.cam_index
             next_cam = self.cam.flip_next()
+            if next_cam == current and self.cam.discovery_pending:
+                self.ui.info("Kamera", "Sedang mencari kamera lain, coba lagi sebentar")
+                return
             self.ui.info("Kamera", f"Beralih ke Camera {next_cam}")
         except Exception as e:
             self.ui.error("Kamera", str(e))
@@ -248,90 +541,30 @@ class DesktopApp:
             return
         
         try:
-            frame = self.cam.read_frame()
+            with self._frame_lock:
+                frame, self._latest_frame = self._latest_frame, None
             if frame is None:
                 return
+            self._metrics["ticks"] += 1
             
             # Multi-face detection
-            faces = self.cam.find_all_faces(frame, max_faces=5)
-            
-            # Update scan line animation
-            self._scan_line_offset = (self._scan_line_offset + 4) % 100
+            # Only bboxes are used here (full frame is uploaded), so skip crop copies
+            faces = self.cam.find_all_faces(frame, max_faces=self.max_faces, copy=False)
             
-            # STATUS COLORS (BGR format)
-            COLOR_SCANNING = (255, 255, 255)  # White - scanning/no match yet
-            COLOR_VERIFYING = (0, 255, 255)   # Yellow - API request in flight
-            COLOR_RECOGNIZED = (0, 255, 0)    # Green - recognized
-            COLOR_UNKNOWN = (0, 0, 255)       # Red - unknown face
+            # Drop to idle FPS when nobody is in front of the camera
+            seen = time.monotonic()
+            if faces:
+                self._last_face_seen = seen
+                self._frame_interval = 1.0 / self.max_fps
+            elif (seen - self._last_face_seen) > self.IDLE_AFTER:
+                self._frame_interval = 1.0 / self.IDLE_FPS
             
-            # Draw bounding boxes with stored recognition results
-            for face in faces:
-                x1, y1, x2, y2 = face["bbox"]
-                queue_id = face["queue_id"]
-                box_h = y2 - y1
-                
-                # Determine status and color
-                label = f"[{queue_id}] Scanning..."
-                color = COLOR_SCANNING
-                status = "scanning"
-                
-                # Check if API is processing
-                if self._request_inflight:
-                    label = f"[{queue_id}] Verifying..."
-                    color = COLOR_VERIFYING
-                    status = "verifying"
-                
-                # Check cached recognition results
-                if hasattr(self, '_last_faces') and queue_id in self._last_faces:
-                    cached = self._last_faces.get(queue_id, {})
-                    if cached.get("name"):
-                        label = f"[{queue_id}] {cached['name']}"
-                        color = COLOR_RECOGNIZED
-                        status = "recognized"
-                    elif cached.get("status") == "unknown":
-                        label = f"[{queue_id}] Unknown"
-                        color = COLOR_UNKNOWN
-                        status = "unknown"
-                
-                # Draw main bounding box (3px thick for visibility)
-                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 3)
-                
-                # Draw corner accents for modern look
-                corner_len = 15
-                # Top-left
-                cv2.line(frame, (x1, y1), (x1 + corner_len, y1), color, 4)
-                cv2.line(frame, (x1, y1), (x1, y1 + corner_len), color, 4)
-                # Top-right
-                cv2.line(frame, (x2, y1), (x2 - corner_len, y1), color, 4)
-                cv2.line(frame, (x2, y1), (x2, y1 + corner_len), color, 4)
-                # Bottom-left
-                cv2.line(frame, (x1, y2), (x1 + corner_len, y2), color, 4)
-                cv2.line(frame, (x1, y2), (x1, y2 - corner_len), color, 4)
-                # Bottom-right
-                cv2.line(frame, (x2, y2), (x2 - corner_len, y2), color, 4)
-                cv2.line(frame, (x2, y2), (x2, y2 - corner_len), color, 4)
-                
-                # Animated scan line (only for scanning/verifying states)
-                if status in ["scanning", "verifying"]:
-                    scan_y = y1 + int((self._scan_line_offset / 100.0) * box_h)
-                    scan_y = max(y1 + 2, min(y2 - 2, scan_y))
-                    cv2.line(frame, (x1 + 3, scan_y), (x2 - 3, scan_y), color, 2)
-                
-                # Draw label background with padding
-                font = cv2.FONT_HERSHEY_SIMPLEX
-                font_scale = 0.55
-                thickness = 2
-                (tw, th), baseline = cv2.getTextSize(label, font, font_scale, thickness)
-                label_y = y1 - 8 if y1 > 30 else y2 + th + 8
-                cv2.rectangle(frame, (x1, label_y - th - 4), (x1 + tw + 8, label_y + 4), color, -1)
-                cv2.putText(frame, label, (x1 + 4, label_y), font, font_scale, (0, 0, 0), thickness)
+            # Face crops are views into the frame: hash them before overlays are drawn
+            face_sig = face_signature(faces) if (self.running and faces) else None
             
-            # Display frame
-            pix = bgr_to_qpixmap(frame)
-            if pix:
-                self.ui.video.setPixmap(
-                    pix.scaled(self.ui.video.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                )
+            # Overlays + preview only while the kiosk tab is on screen
+            if self._kiosk_visible:
+                self._render_preview(frame, faces)
             
             if not self.running:
                 return
@@ -341,60 +574,217 @@ class DesktopApp:
                 return
             
             # Rate limiting
-            now = time.time()
+            now = time.monotonic()
             with self._lock:
                 if (now - self.last_sent) < self.request_interval:
                     return
-                if self._request_inflight:
+                # Same faces as the last upload: skip encode + POST
+                if ((now - self._last_sig_time) < self.DUPLICATE_WINDOW
+                        and same_faces(face_sig, self._last_sig)):
+                    return
+                if not self._inflight_sem.acquire(blocking=False):
                     return
+                self._inflight_count += 1
+                cached = self._lookup_result(face_sig, now)
                 self.last_sent = now
-                self._request_inflight = True
+            self._last_sig = face_sig
+            self._last_sig_time = now
             
-            # Encode for API: Resize large images to max 800px width for speed
-            h, w = frame.shape[:2]
-            upload_frame = frame
-            if w > 800:
-                scale = 800 / w
-                new_h = int(h * scale)
-                upload_frame = cv2.resize(frame, (800, new_h), interpolation=cv2.INTER_AREA)
+            # Look-alike of a recent result: paint its labels while the frame is still
+            # sent - a hash match is never proof of identity, the server decides
+            if cached is not None:
+                self._metrics["cache_hits"] += 1
+                self._store_face_labels(cached.get("faces", []))
+            self._metrics["requests"] += 1
             
-            jpg = self.cam.encode_jpg(upload_frame, quality=85)
-            if jpg:
-                threading.Thread(target=self._recognize_multi, args=(jpg,), daemon=True).start()
-            else:
-                with self._lock:
-                    self._request_inflight = False
+            # Resize + JPEG encode happen in the worker. read_frame() returns a
+            # fresh array every tick and tick() is done with it, so no copy.
+            self._executor.submit(self._recognize_multi, frame, face_sig, len(faces))
                     
         except Exception as e:
             logger.error(f"Tick error: {e}")
     
-    def _recognize_multi(self, jpg_bytes):
+    def _render_preview(self, frame, faces):
+        """Draw face overlays and push the frame to the kiosk video label"""
+        # Update scan line animation (nothing to animate without faces)
+        if faces:
+            self._scan_line_offset = (self._scan_line_offset + 4) % 100
+        
+        # Draw bounding boxes with stored recognition results
+        boxes, colors, labels = [], [], []
+        for face in faces:
+            x1, y1, x2, y2 = face["bbox"]
+            queue_id = face["queue_id"]
+            box_h = y2 - y1
+            
+            # Determine status and color
+            label = f"[{queue_id}] Scanning..."
+            color = COLOR_SCANNING
+            status = "scanning"
+            
+            # Check if API is processing
+            if self._inflight_count:
+                label = f"[{queue_id}] Verifying..."
+                color = COLOR_VERIFYING
+                status = "verifying"
+            
+            # Check cached recognition results
+            cached = self._last_faces.get(queue_id)
+            if cached:
+                if cached.get("name"):
+                    label = f"[{queue_id}] {cached['name']}"
+                    color = COLOR_RECOGNIZED
+                    status = "recognized"
+                elif cached.get("status") == "unknown":
+                    label = f"[{queue_id}] Unknown"
+                    color = COLOR_UNKNOWN
+                    status = "unknown"
+            
+            # Animated scan line (only for scanning/verifying states)
+            scan_y = -1
+            if status in ["scanning", "verifying"]:
+                scan_y = y1 + int((self._scan_line_offset / 100.0) * box_h)
+                scan_y = max(y1 + 2, min(y2 - 2, scan_y))
+            
+            boxes.append((x1, y1, x2, y2, scan_y))
+            colors.append(color)
+            labels.append(label)
+        
+        if boxes:
+            # Box + corner accents + scan lines for every face in one native call
+            colors = np.array(colors, dtype=np.uint8)
+            draw_face_boxes(frame, np.array(boxes, dtype=np.int32), colors)
+            
+            # Draw label background with padding (text stays per face)
+            font = cv2.FONT_HERSHEY_SIMPLEX
+            font_scale = 0.55
+            thickness = 2
+            for (x1, y1, x2, y2, _), color, label in zip(boxes, colors, labels):
+                (tw, th), baseline = cv2.getTextSize(label, font, font_scale, thickness)
+                label_y = y1 - 8 if y1 > 30 else y2 + th + 8
+                _fill_rect(frame, x1, label_y - th - 4, x1 + tw + 9, label_y + 5, color)
+                cv2.putText(frame, label, (x1 + 4, label_y), font, font_scale, (0, 0, 0), thickness)
+        
+        # Display frame (skip repaint if nothing visible changed). Every 2nd row
+        # so the 2px scan line is always sampled, every 16th column.
+        size = self.ui.video.size()
+        frame_key = (zlib.crc32(frame[::2, ::16].tobytes()), size.width(), size.height())
+        if frame_key != self._last_frame_key:
+            self._last_frame_key = frame_key
+            pix = bgr_to_qpixmap(self._scale_preview(frame, size))
+            if pix:
+                self.ui.video.setPixmap(pix)
+    
+    def _scale_preview(self, frame, size):
+        """Resize frame into the persistent preview buffer (keep aspect ratio)"""
+        fh, fw = frame.shape[:2]
+        key = (fw, fh, size.width(), size.height())
+        if key != self._preview_key:
+            scale = min(size.width() / fw, size.height() / fh)
+            tw, th = max(1, int(fw * scale)), max(1, int(fh * scale))
+            self._preview_buf = np.empty((th, tw, 3), dtype=np.uint8)
+            self._preview_key = key
+        th, tw = self._preview_buf.shape[:2]
+        # Nearest-neighbour: bilinear is wasted on a live preview
+        cv2.resize(frame, (tw, th), dst=self._preview_buf, interpolation=cv2.INTER_NEAREST)
+        return self._preview_buf
+    
+    def _lookup_result(self, face_sig, now):
+        """Fresh cached result for the same faces in the same places (caller holds _lock)"""
+        for key in reversed(self._result_cache):
+            payload, ts = self._result_cache[key]
+            if (now - ts) < self.RESULT_CACHE_TTL and same_faces(key, face_sig):
+                self._result_cache.move_to_end(key)
+                return payload
+        return None
+    
+    def _cache_result(self, face_sig, result):
+        """Remember recognized faces, evicting the least recently used"""
+        if not face_sig or not result.get("recognized_names"):
+            return
+        # Only when every detected face got a confirmed identity - unknowns must be retried
+        faces = result.get("faces", [])
+        if len(faces) != len(face_sig):
+            return
+        if any(not f.get("name") or f.get("status") == "unknown" for f in faces):
+            return
+        with self._lock:
+            self._result_cache[face_sig] = (result, time.monotonic())
+            self._result_cache.move_to_end(face_sig)
+            while len(self._result_cache) > self.RESULT_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+    
+    def _encode_upload(self, frame, n_faces=0):
+        """Encode for API: Downscale so the longest side fits RECOG_INPUT_SIZE"""
+        h, w = frame.shape[:2]
+        limit = self.recog_input_size
+        if n_faces <= 2:
+            limit = min(limit, 640)  # Few faces are large enough at 640px (~36% fewer pixels)
+        # Hysteresis: a frame barely over the limit is sent as-is, not resampled
+        if max(h, w) > limit * 1.125:
+            scale = limit / max(h, w)
+            dsize = (int(w * scale), int(h * scale))
+            # Per-worker destination buffer, reused while the size stays the same
+            buf = getattr(self._upload_local, "buf", None)
+            if buf is None or buf.shape[:2] != (dsize[1], dsize[0]):
+                buf = self._upload_local.buf = np.empty((dsize[1], dsize[0], 3), dtype=np.uint8)
+            frame = cv2.resize(frame, dsize, dst=buf, interpolation=cv2.INTER_LINEAR)
+        return self.cam.encode_jpg(frame, quality=self.recog_jpeg_quality)
+    
+    def _update_interval(self, elapsed):
+        """Fold one API latency sample into the EMA and retune request_interval"""
+        self._metrics["reco_latency_ms"].append(elapsed * 1000.0)
+        with self._lock:
+            if self._api_ema is None:
+                self._api_ema = elapsed
+            else:
+                self._api_ema = 0.8 * self._api_ema + 0.2 * elapsed
+            self.request_interval = max(self.interval_min, min(self.interval_max, 1.5 * self._api_ema))
+    
+    def _log_metrics(self):
+        """Log FPS, recognition latency percentiles and queue depth for tuning"""
+        now = time.monotonic()
+        m = self._metrics
+        window = max(now - self._metrics_since, 1e-6)
+        latencies = list(m["reco_latency_ms"])
+        if len(latencies) >= 2:
+            q = statistics.quantiles(latencies, n=20)
+            p50, p95 = q[9], q[18]
+        else:
+            p50 = p95 = latencies[0] if latencies else 0.0
+        depth = self.client.offline_queue_size
+        
+        if m["ticks"] or m["frames_dropped"] or depth:
+            logger.info(
+                f"Metrics: fps={m['ticks'] / window:.1f} dropped={m['frames_dropped']} "
+                f"requests={m['requests']} cache_hits={m['cache_hits']} inflight={self._inflight_count} "
+                f"reco_p50={p50:.0f}ms reco_p95={p95:.0f}ms interval={self.request_interval:.2f}s "
+                f"queue_depth={depth}"
+            )
+        for key in ("ticks", "frames_dropped", "requests", "cache_hits"):
+            m[key] = 0
+        self._metrics_since = now
+    
+    def _recognize_multi(self, frame, face_sig=None, n_faces=0):
         """Background multi-face recognition thread"""
         try:
+            jpg_bytes = self._encode_upload(frame, n_faces)
+            if not jpg_bytes:
+                return
+            started = time.monotonic()
             result = self.client.recognize_multi(jpg_bytes)
-            self._result_queue.put(("result_multi", result))
+            if result.get("status") != "offline_queued":
+                # Queued-offline returns instantly - not a latency sample
+                self._update_interval(time.monotonic() - started)
+            self._cache_result(face_sig, result)
+            self._signals.result_multi.emit(result)
         except Exception as e:
             logger.error(f"Multi-face recognition error: {e}")
-            self._result_queue.put(("error", str(e)))
+            self._signals.error.emit(str(e))
         finally:
             with self._lock:
-                self._request_inflight = False
-    
-
-    
-    def _process_result_queue(self):
-        """Process results from queue in main thread"""
-        try:
-            while not self._result_queue.empty():
-                msg_type, data = self._result_queue.get_nowait()
-                if msg_type == "result_multi":
-                    self._handle_multi_result(data)
-                elif msg_type == "error":
-                    self._handle_error(data)
-                elif msg_type == "connection_status":
-                    self._handle_connection_status(data)
-        except Exception as e:
-            logger.error(f"Queue processing error: {e}")
+                self._inflight_count -= 1
+            self._inflight_sem.release()
     
     def _handle_connection_status(self, data: dict):
         """Update UI to show connection status (called from main thread)"""
@@ -421,19 +811,14 @@ class DesktopApp:
         combined_audio = data.get("combined_audio", "")
         
         # Store faces for bounding box labels
-        self._last_faces = {}
-        for face in faces:
-            self._last_faces[face.get("queue_id", 0)] = {
-                "name": face.get("name"),
-                "status": face.get("status")
-            }
+        self._store_face_labels(faces)
         
         if not recognized_names:
             logger.info("Multi-face: no recognized faces")
             return
         
         # Collect faces for delayed greeting
-        self._last_face_time = time.time()
+        self._last_face_time = time.monotonic()
         self._greeting_triggered = False
         
         # Add new faces to pending (avoid duplicates)
@@ -441,7 +826,8 @@ class DesktopApp:
             if face.get("name") and face.get("status") == "ok":
                 name = face["name"]
                 # Check if already in pending
-                if not any(p["name"] == name for p in self._pending_faces):
+                if name not in self._pending_names:
+                    self._pending_names.add(name)
                     self._pending_faces.append({
                         "name": name,
                         "event_type": face.get("event_type", ""),
@@ -462,12 +848,21 @@ class DesktopApp:
         
         logger.info(f"Multi-face: collected {len(self._pending_faces)} faces, waiting...")
     
+    def _store_face_labels(self, faces):
+        """Store per-face recognition result for bounding box labels"""
+        self._last_faces = {}
+        for face in faces:
+            self._last_faces[face.get("queue_id", 0)] = {
+                "name": face.get("name"),
+                "status": face.get("status")
+            }
+    
     def _check_greeting_delay(self):
         """Check if 3 seconds passed without new faces - trigger greeting"""
         if not self._pending_faces or self._greeting_triggered:
             return
         
-        now = time.time()
+        now = time.monotonic()
         if (now - self._last_face_time) >= self.GREETING_DELAY:
             self._trigger_combined_greeting()
     
@@ -477,74 +872,66 @@ class DesktopApp:
             return
         
         self._greeting_triggered = True
-        pending = self._pending_faces.copy()
+        pending = self._pending_faces
         self._pending_faces = []
+        self._pending_names = set()
         
-        # Generate greeting message
-        names = [p["name"] for p in pending]
+        # Generate greeting message + check event types (single pass)
+        names = []
+        has_late = has_out = False
+        for p in pending:
+            names.append(p["name"])
+            has_late = has_late or bool(p.get("late"))
+            has_out = has_out or p.get("event_type") == "OUT"
         
         # Natural naming (A, B, dan C)
         if len(names) == 1:
             names_str = names[0]
-            sapaan_nama = f"Halo {names[0]}"
         elif len(names) == 2:
             names_str = f"{names[0]} dan {names[1]}"
-            sapaan_nama = f"Halo {names[0]} dan {names[1]}"
         else:
             # > 2 names: A, B, dan C
             names_str = ", ".join(names[:-1]) + ", dan " + names[-1]
-            sapaan_nama = f"Halo semuanya" # Shorten for many people to avoid robotic listing
-        
-        # Check event types
-        has_late = any(p.get("late") for p in pending)
-        has_out = any(p.get("event_type") == "OUT" for p in pending)
-        
-        hour = int(time.strftime("%H"))
-        if hour < 10:
-            waktu = "pagi"
-        elif hour < 15:
-            waktu = "siang"
-        elif hour < 18:
-            waktu = "sore"
-        else:
-            waktu = "malam"
         
         # Natural conversational phrasing
-        if has_out:
-            combined_audio = f"Terima kasih {names_str}. Hati-hati di jalan, sampai jumpa besok!"
-        elif has_late:
-            combined_audio = f"Selamat {waktu} {names_str}. Absensi masuk sudah tercatat, tapi jangan terlambat lagi ya."
-        else:
-            combined_audio = f"Selamat {waktu} {names_str}. Absensi berhasil. Selamat beraktivitas!"
+        template = GREETING_OUT if has_out else GREETING_LATE if has_late else GREETING_OK
+        combined_audio = template.format(waktu=time_of_day(datetime.now().hour), names=names_str)
         
         # Update UI
         self.ui.badge.setText(f"✓ {names_str}")
         self.ui.animate_greeting(combined_audio)
         
-        # Log to admin dashboard
+        # Log to admin dashboard (one relayout/repaint for the whole group)
         ts = time.strftime("%H:%M:%S")
-        for p in pending:
-            event_type = p.get("event_type", "")
-            late = p.get("late", False)
-            event_info = f" ({event_type})" if event_type else ""
-            late_info = " [Terlambat]" if late else ""
-            log_entry = f"[{ts}] {p['name']} - ok{event_info}{late_info}"
-            self.ui.activity_list.insertItem(0, log_entry)
-        
-        # Keep activity list to 50 items
-        while self.ui.activity_list.count() > 50:
-            self.ui.activity_list.takeItem(self.ui.activity_list.count() - 1)
+        activity = self.ui.activity_list
+        activity.setUpdatesEnabled(False)
+        activity.blockSignals(True)
+        try:
+            for p in pending[-50:]:  # Only the newest 50 would survive the cap anyway
+                event_type = p.get("event_type", "")
+                late = p.get("late", False)
+                event_info = f" ({event_type})" if event_type else ""
+                late_info = " [Terlambat]" if late else ""
+                log_entry = f"[{ts}] {p['name']} - ok{event_info}{late_info}"
+                activity.insertItem(0, log_entry)
+            
+            # Keep activity list to 50 items
+            for _ in range(activity.count() - 50):
+                activity.takeItem(activity.count() - 1)
+        finally:
+            activity.blockSignals(False)
+            activity.setUpdatesEnabled(True)
         
         # Update stats
         for p in pending:
             event_type = p.get("event_type", "")
             late = p.get("late", False)
             if event_type == "IN":
-                self.stats["checkin"] += 1
+                self._checkin += 1
                 if late:
-                    self.stats["late"] += 1
+                    self._late += 1
             elif event_type == "OUT":
-                self.stats["checkout"] += 1
+                self._checkout += 1
         self._update_stat_cards()
         
         # TTS - use speak_once with cooldown
@@ -564,21 +951,32 @@ class DesktopApp:
         ts = time.strftime("%H:%M:%S")
         self.ui.push_history(f"[{ts}] Error: {error_msg}")
     
+    @property
+    def stats(self) -> dict:
+        """Dashboard counters as a dict (read-only view)"""
+        return {"checkin": self._checkin, "checkout": self._checkout,
+                "late": self._late, "total_registered": self._total_registered}
+    
+    def _reset_stats(self, total_registered=0):
+        """Zero the attendance counters"""
+        self._checkin = self._checkout = self._late = 0
+        self._total_registered = total_registered
+    
     def _update_stat_cards(self):
         """Update dashboard stat cards"""
-        self.ui.stat_checkin.set_value(str(self.stats["checkin"]))
-        self.ui.stat_checkout.set_value(str(self.stats["checkout"]))
-        self.ui.stat_late.set_value(str(self.stats["late"]))
-        self.ui.stat_total.set_value(str(self.stats.get("total_registered", 0)))
+        self.ui.stat_checkin.set_value(str(self._checkin))
+        self.ui.stat_checkout.set_value(str(self._checkout))
+        self.ui.stat_late.set_value(str(self._late))
+        self.ui.stat_total.set_value(str(self._total_registered))
     
     def refresh_stats(self):
         """Refresh stats and get total registered from API"""
-        self.stats = {"checkin": 0, "checkout": 0, "late": 0, "total_registered": 0}
+        self._reset_stats()
         # Try to get total registered from API
         try:
             if self.client.admin_token:
                 persons = self.client.admin_list_persons()
-                self.stats["total_registered"] = len(persons)
+                self._total_registered = len(persons)
         except Exception:
             pass
         self._update_stat_cards()
@@ -589,7 +987,6 @@ class DesktopApp:
         if not self._ensure_admin():
             return
         
-        from PySide6.QtWidgets import QMessageBox
         reply = QMessageBox.question(
             self.ui, "Konfirmasi Reset",
             "Apakah Anda yakin ingin menghapus SEMUA data absensi?\n\nTindakan ini tidak dapat dibatalkan!",
@@ -604,8 +1001,7 @@ class DesktopApp:
                 daily = result.get("daily_deleted", 0)
                 
                 # Reset local stats (keep total_registered)
-                total = self.stats.get("total_registered", 0)
-                self.stats = {"checkin": 0, "checkout": 0, "late": 0, "total_registered": total}
+                self._reset_stats(self._total_registered)
                 self._update_stat_cards()
                 
                 # Clear activity list
@@ -618,6 +1014,52 @@ class DesktopApp:
                 self.ui.error("Reset", str(e))
     
     # Admin methods
+    def apply_settings(self):
+        """Validate, apply and save changed API URL / device ID (no restart)"""
+        api_base = self.ui.api_url.text().strip().rstrip("/")
+        device_id = self.ui.device_id.text().strip()
+        url = urlparse(api_base)
+        if url.scheme not in ("http", "https") or not url.netloc:
+            self.ui.error("Settings", "API URL tidak valid (contoh: http://localhost:8000)")
+            return
+        if not device_id:
+            self.ui.error("Settings", "Device ID harus diisi")
+            return
+        
+        changes = {}
+        if api_base and api_base != self.api_base:
+            changes["base_url"] = self.api_base = api_base
+        if device_id and device_id != self.device_id:
+            changes["device_id"] = self.device_id = device_id
+        if not changes:
+            return
+        self._save_settings()
+        
+        was_admin = bool(self.client.admin_token)
+        self.client.reconfigure(**changes)
+        if was_admin and not self.client.admin_token:
+            self.ui.show_logged_out()
+            self.ui.info("Admin", "API URL berubah, silakan login admin lagi")
+        with self._lock:
+            self._result_cache.clear()  # Recognitions came from the old server
+            self._last_sig = None
+        if "base_url" in changes:
+            self._offline_retries = 0  # Health backoff belonged to the old server
+        logger.info(f"Settings applied: {changes}")
+        self.ui.info("Settings", "Pengaturan disimpan")
+        self._check_connection_health()
+    
+    def _save_settings(self):
+        """Write API_BASE / DEVICE_ID back to .env so a restart keeps them"""
+        try:
+            if not os.path.exists(ENV_PATH):
+                open(ENV_PATH, "a").close()
+            set_key(ENV_PATH, "API_BASE", self.api_base)
+            set_key(ENV_PATH, "DEVICE_ID", self.device_id)
+        except OSError as e:
+            logger.error(f"Failed to save settings to {ENV_PATH}: {e}")
+            self.ui.error("Settings", f"Gagal menyimpan .env: {e}")
+    
     def _ensure_admin(self) -> bool:
         if not self.client.admin_token:
             self.ui.error("Admin", "Silakan login admin dulu")
@@ -651,11 +1093,15 @@ class DesktopApp:
     def _auto_flow_after_login(self):
         """Auto-flow setelah login: load data dan pindah ke kiosk"""
         try:
-            # 1. Load people list
-            people = self.client.admin_list_persons()
-            self.ui.people_list.clear()
-            for p in people:
-                self.ui.people_list.addItem(f"{p['id']} | {p['name']}")
+            # 1. Load people, latest events and this month's report in one concurrent round
+            month = self.ui.r_month.text().strip() or datetime.now(WIB).strftime("%Y-%m")
+            bundle = self.client.admin_dashboard_bundle(month=month, events_limit=self.ui.ev_limit.value())
+            people = bundle["persons"]
+            self._fill_people_list(people)
+            self._fill_events_table(bundle["events"])
+            if bundle["report"] is not None:
+                self.ui.r_month.setText(month)
+                self._fill_report_table(bundle["report"])
             
             # 2. Preload TTS greetings
             names = [p['name'] for p in people]
@@ -663,11 +1109,12 @@ class DesktopApp:
                 logger.info(f"Preloading TTS for {len(names)} people...")
                 self.tts.preload_common_greetings(names)
             
-            # 3. Load today's stats
-            self.refresh_stats()
+            # 3. Reset today's stats (total registered comes from the bundle)
+            self._reset_stats(len(people))
+            self._update_stat_cards()
             
             # 4. Switch to Kiosk tab (index 1)
-            self.ui.tabs.setCurrentIndex(1)
+            self.ui.tabs.setCurrentIndex(KIOSK_TAB)
             
             # Note: Scanning NOT started automatically - user must click button
             
@@ -678,15 +1125,21 @@ class DesktopApp:
             logger.error(f"Auto-flow error: {e}")
             self.ui.error("Auto-Flow", f"Gagal memuat data: {e}")
     
+    def _fill_people_list(self, people):
+        """Rebuild the people list; person id rides along as item data"""
+        self.ui.people_list.clear()
+        for p in people:
+            item = QListWidgetItem(p['name'])
+            item.setData(Qt.UserRole, p['id'])
+            self.ui.people_list.addItem(item)
+    
     def load_people(self):
         """Load people list and preload TTS greetings"""
         if not self._ensure_admin():
             return
         try:
             people = self.client.admin_list_persons()
-            self.ui.people_list.clear()
-            for p in people:
-                self.ui.people_list.addItem(f"{p['id']} | {p['name']}")
+            self._fill_people_list(people)
             
             # Preload TTS greetings for all people (background thread)
             names = [p['name'] for p in people]
@@ -723,7 +1176,7 @@ class DesktopApp:
             self.ui.error("Delete", "Pilih person dulu")
             return
         try:
-            pid = int(item.text().split("|")[0].strip())
+            pid = item.data(Qt.UserRole)
             self.client.admin_delete_person(pid)
             self.load_people()
             self.ui.info("Delete", "Person dihapus")
@@ -740,48 +1193,28 @@ class DesktopApp:
             return
         
         try:
-            pid = int(item.text().split("|")[0].strip())
-            name = item.text().split("|")[1].strip()
+            pid = item.data(Qt.UserRole)
+            name = item.text()
             
             # Open camera capture dialog
-            from ui import CameraCaptureDialog
-            dialog = CameraCaptureDialog(self.ui, person_name=name)
+            # Captures are JPEG-encoded in the background while the user keeps shooting
+            dialog = CameraCaptureDialog(self.ui, person_name=name,
+                                         encoder=lambda img: self.cam.encode_jpg(img, quality=95))
             
-            from PySide6.QtWidgets import QDialog
             if dialog.exec() == QDialog.Accepted:
-                images = dialog.get_captured_images()
-                if not images:
+                if not dialog.get_captured_images():
                     self.ui.error("Capture", "Tidak ada foto yang dicapture")
                     return
                 
-                # Save captured images to temp files and upload
-                import tempfile
-                import os
-                import cv2
-                
-                temp_files = []
-                temp_dir = tempfile.mkdtemp()
-                
-                for i, img in enumerate(images):
-                    filepath = os.path.join(temp_dir, f"capture_{i+1}.jpg")
-                    cv2.imwrite(filepath, img)
-                    temp_files.append(filepath)
+                # Already encoded in memory - upload in one request (no temp files)
+                jpgs = dialog.get_captured_jpegs()
+                if not jpgs:
+                    self.ui.error("Capture", "Gagal memproses foto")
+                    return
                 
-                # Upload to API
-                result = self.client.admin_enroll_person(pid, temp_files)
+                result = self.client.admin_enroll_person_bytes(pid, jpgs)
                 added = result.get("embeddings_added", 0)
                 
-                # Cleanup temp files
-                for f in temp_files:
-                    try:
-                        os.remove(f)
-                    except:
-                        pass
-                try:
-                    os.rmdir(temp_dir)
-                except:
-                    pass
-                
                 self.ui.info("Capture", f"Berhasil enroll {added} foto untuk {name}")
                 logger.info(f"Camera enroll: {added} photos for {name} (pid={pid})")
             
@@ -798,8 +1231,8 @@ class DesktopApp:
             self.ui.error("Enroll", "Pilih person dulu")
             return
         try:
-            pid = int(item.text().split("|")[0].strip())
-            name = item.text().split("|")[1].strip()
+            pid = item.data(Qt.UserRole)
+            name = item.text()
             files = self.ui.pick_images()
             if not files:
                 return
@@ -830,48 +1263,30 @@ class DesktopApp:
             limit = self.ui.ev_limit.value()
             
             events = self.client.admin_list_events(limit=limit, status=status, name=name, day=day)
-            
-            self.ui.ev_table.setRowCount(0)
-            for ev in events:
-                row = self.ui.ev_table.rowCount()
-                self.ui.ev_table.insertRow(row)
-                self.ui.ev_table.setItem(row, 0, QTableWidgetItem(str(ev.get("id", ""))))
-                self.ui.ev_table.setItem(row, 1, QTableWidgetItem(ev.get("day", "")))
-                
-                # Format time to readable format (convert UTC to WIB +7)
-                ts_raw = ev.get("ts", "")
-                if ts_raw:
-                    try:
-                        from datetime import datetime, timedelta
-                        # Parse datetime string (remove any trailing Z or timezone)
-                        ts_clean = ts_raw.replace("Z", "").replace("+00:00", "")
-                        if "T" in ts_clean:
-                            ts_clean = ts_clean.split("T")[1]  # Get time part only
-                        if "." in ts_clean:
-                            ts_clean = ts_clean.split(".")[0]  # Remove microseconds
-                        
-                        # Parse as time, add 7 hours for WIB
-                        parts = ts_clean.split(":")
-                        hour = int(parts[0]) + 7  # UTC to WIB
-                        if hour >= 24:
-                            hour -= 24
-                        ts_display = f"{hour:02d}:{parts[1]}:{parts[2] if len(parts) > 2 else '00'}"
-                    except:
-                        ts_display = ts_raw[:8]  # Fallback
-                else:
-                    ts_display = ""
-                
-                self.ui.ev_table.setItem(row, 2, QTableWidgetItem(ts_display))
-                self.ui.ev_table.setItem(row, 3, QTableWidgetItem(ev.get("device_id", "") or ev.get("device", "")))
-                self.ui.ev_table.setItem(row, 4, QTableWidgetItem(ev.get("final_name", "") or "-"))
-                self.ui.ev_table.setItem(row, 5, QTableWidgetItem(ev.get("event_type", "") or "-"))
-                self.ui.ev_table.setItem(row, 6, QTableWidgetItem(ev.get("status", "")))
-                self.ui.ev_table.setItem(row, 7, QTableWidgetItem(str(round(ev.get("distance", 0) or 0, 2))))
+            self._fill_events_table(events)
             
             self.ui.info("Events", f"Loaded {len(events)} events")
         except Exception as e:
             self.ui.error("Events", str(e))
     
+    def _fill_events_table(self, events):
+        """Show events in the events table"""
+        rows = []
+        append = rows.append
+        for ev in events:
+            get = ev.get
+            append((
+                str(get("id", "")),
+                get("day", ""),
+                format_wib_time(get("ts", "")),
+                get("device_id") or get("device", ""),
+                get("final_name") or "-",
+                get("event_type") or "-",
+                get("status", ""),
+                f"{get('distance') or 0:.2f}",
+            ))
+        _fill_table(self.ui.ev_table, rows)
+    
     def correct_event(self):
         """Correct event entry"""
         if not self._ensure_admin():
@@ -896,20 +1311,24 @@ class DesktopApp:
             return
         try:
             report = self.client.admin_monthly_report(month)
-            
-            self.ui.report_table.setRowCount(0)
-            for item in report.get("data", []):
-                row = self.ui.report_table.rowCount()
-                self.ui.report_table.insertRow(row)
-                self.ui.report_table.setItem(row, 0, QTableWidgetItem(item.get("person_name", "")))
-                self.ui.report_table.setItem(row, 1, QTableWidgetItem(str(item.get("days_present", 0))))
-                self.ui.report_table.setItem(row, 2, QTableWidgetItem(str(item.get("late_count", 0))))
-                self.ui.report_table.setItem(row, 3, QTableWidgetItem(str(item.get("missing_out", 0))))
+            self._fill_report_table(report)
             
             self.ui.info("Report", f"Report {month} loaded")
         except Exception as e:
             self.ui.error("Report", str(e))
     
+    def _fill_report_table(self, report):
+        """Show a monthly report in the report table"""
+        _fill_table(self.ui.report_table, [
+            (
+                item.get("person_name", ""),
+                str(item.get("days_present", 0)),
+                str(item.get("late_count", 0)),
+                str(item.get("missing_out", 0)),
+            )
+            for item in report.get("data", [])
+        ])
+    
     def export_csv(self):
         """Export attendance data to CSV"""
         if not self._ensure_admin():
@@ -917,7 +1336,6 @@ class DesktopApp:
         
         month = self.ui.r_month.text().strip() or None
         
-        from PySide6.QtWidgets import QFileDialog
         filename, _ = QFileDialog.getSaveFileName(
             self.ui, 
             "Simpan CSV", 
@@ -929,23 +1347,8 @@ class DesktopApp:
             return
         
         try:
-            # Download CSV from API
-            import requests
-            headers = {"Authorization": f"Bearer {self.client.admin_token}"}
-            params = {}
-            if month:
-                params["month"] = month
-            
-            response = requests.get(
-                f"{self.api_base}/admin/reports/export/csv",
-                headers=headers,
-                params=params
-            )
-            response.raise_for_status()
-            
-            # Save to file
-            with open(filename, "w", encoding="utf-8") as f:
-                f.write(response.text)
+            # Download CSV from API (streamed straight to disk)
+            self.client.admin_export_csv(filename, month)
             
             self.ui.info("Export", f"CSV tersimpan: {filename}")
             logger.info(f"CSV exported to: {filename}")
@@ -956,6 +1359,9 @@ class DesktopApp:
 
     def _sync_offline_queue(self):
         """Sync offline queue in background"""
+        if self._sync_future is not None and not self._sync_future.done():
+            return
+        
         def _sync():
             try:
                 count = self.client.process_offline_queue()
@@ -964,19 +1370,36 @@ class DesktopApp:
             except Exception as e:
                 logger.error(f"Sync error: {e}")
                 
-        threading.Thread(target=_sync, daemon=True).start()
+        self._sync_future = self._io_executor.submit(_sync)
     
     def _check_connection_health(self):
         """Periodic connection health check with smart retry interval"""
+        # Live recognition traffic already proves (or tests) the link: no extra
+        # ping while one is in flight or right after one succeeded
+        if self._inflight_count:
+            return
+        if self.client.is_online and self.client.last_ok_age < self.request_interval * 2:
+            return
+        if self._health_future is not None and not self._health_future.done():
+            return
+        
         def _health_check():
             was_online = self.client.is_online
-            is_online_now = self.client.check_health()
+            # This timer owns the backoff (jittered below) - always send a real probe
+            is_online_now = self.client.check_health(paced=False)
             
-            # Send status and new interval to main thread via queue
+            # Offline: 10s, 20s, 40s ... capped at 5 min, jittered so kiosks don't sync up
             if is_online_now:
-                self._result_queue.put(("connection_status", {"status": "online", "interval": 30000}))
+                self._offline_retries = 0
+                interval = HEALTH_ONLINE_MS
             else:
-                self._result_queue.put(("connection_status", {"status": "offline", "interval": 10000}))
+                interval = min(HEALTH_OFFLINE_MS * (2 ** self._offline_retries), HEALTH_MAX_MS)
+                self._offline_retries = min(self._offline_retries + 1, 10)
+            interval += random.randint(0, 1000)
+            
+            # Send status and new interval to main thread via signal
+            status = "online" if is_online_now else "offline"
+            self._signals.connection_status.emit({"status": status, "interval": interval})
             
             # Log state change
             if was_online and not is_online_now:
@@ -984,18 +1407,20 @@ class DesktopApp:
             elif not was_online and is_online_now:
                 logger.info("Connection restored! API is back online.")
         
-        threading.Thread(target=_health_check, daemon=True).start()
+        self._health_future = self._io_executor.submit(_health_check)
 
     def cleanup(self):
         """Cleanup resources"""
-        self.timer.stop()
+        self._stop_capture()
+        self.metrics_timer.stop()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._io_executor.shutdown(wait=False, cancel_futures=True)
         self.cam.release()
         self.tts.cleanup()
         logger.info("App cleanup completed")
 
 
 def main():
-    import sys
     logger.info("Starting application...")
     
     app = QApplication(sys.argv)
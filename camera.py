@@ -4,43 +4,91 @@ import cv2
 import numpy as np
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import List, Dict, Optional, Tuple
 from logger_config import get_logger
 
 logger = get_logger("camera")
 
+try:
+    from turbojpeg import TurboJPEG, TJSAMP_420, TJFLAG_FASTDCT
+    _turbo = TurboJPEG()
+except (ImportError, OSError, RuntimeError):  # optional: needs libturbojpeg too, falls back to cv2
+    _turbo = None
+
+# Haar detection runs on frames downscaled to this width (boxes mapped back)
+DETECT_WIDTH = 480
+HAAR_SCALE_FACTOR = 1.2  # OpenCV default pyramid step (1.05 built ~4x more levels)
+HAAR_MIN_NEIGHBORS = 4
+
+# Camera discovery: indices probed in parallel, probes slower than this are dropped
+DISCOVERY_TIMEOUT = 2.0
+
+# Between full detections (every DETECT_EVERY frames) boxes are reused while the
+# scene stays still: mean abs diff of an 80x60 gray thumbnail below MOTION_THRESHOLD
+DETECT_EVERY = 3
+MOTION_SIZE = (80, 60)
+MOTION_THRESHOLD = 2.0
+
+# Optional OpenCV SSD face detector (assets/), Haar is used when files are absent
+DNN_PROTOTXT = "deploy.prototxt"
+DNN_MODEL = "res10_300x300_ssd_iter_140000.caffemodel"
+DNN_INPUT_SIZE = (300, 300)
+DNN_MEAN = (104.0, 177.0, 123.0)
+DNN_CONFIDENCE = 0.5
+
+# TurboJPEG's fast (less accurate) DCT is used only below this quality
+FAST_DCT_MAX_QUALITY = 90
+
+# PyInstaller temp folder, else the working dir (resolved once at import)
+_BASE_PATH = getattr(sys, "_MEIPASS", None) or os.path.abspath(".")
+
+
 def resource_path(relative_path):
     """Get absolute path to resource, works for dev and for PyInstaller"""
-    try:
-        # PyInstaller temp folder
-        base_path = sys._MEIPASS
-    except Exception:
-        base_path = os.path.abspath(".")
-    return os.path.join(base_path, relative_path)
+    return os.path.join(_BASE_PATH, relative_path)
+
+def _pad_clip(boxes, w, h, pad):
+    """(n, 4) x, y, w, h boxes -> padded x1, y1, x2, y2 clipped to the frame"""
+    x, y, bw, bh = boxes.T
+    px = (bw * pad).astype(np.int32)
+    py = (bh * pad).astype(np.int32)
+    return np.stack((
+        np.maximum(x - px, 0),
+        np.maximum(y - py, 0),
+        np.minimum(x + bw + px, w),
+        np.minimum(y + bh + py, h),
+    ), axis=1)
+
 
 class CameraFaceCropper:
+    # Parsed once per process and shared by all instances (detection is read-only)
+    _FACE_CASCADE = None
+    _FACE_CASCADE_LOCK = threading.Lock()
+
     def __init__(self, cam_index=0, auto_open=False):
         self.cam_index = cam_index
-        # Initialize Haar Cascade from bundled assets
-        cascade_path = resource_path(os.path.join("assets", "haarcascade_frontalface_default.xml"))
-        self.face_cascade = cv2.CascadeClassifier(cascade_path)
-        
-        if self.face_cascade.empty():
-            logger.error(f"Failed to load cascade from: {cascade_path}")
-            # Fallback to cv2.data as last resort (works in dev if assets invalid)
-            self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        
-        if self.face_cascade.empty():
+        self.face_cascade = self._get_cascade()
+        self.face_net = self._load_face_net()
+        if self.face_cascade.empty() and self.face_net is None:
             logger.critical("Could not load face cascade classifier!")
         self.cap = None
         self._lock = threading.Lock()
         self._frame_count = 0
         self._last_error_time = 0
         self._mirror_mode = False  # False = normal, True = mirror
-        self._available_cameras = []
-        
-        # Discover cameras only if needed or in background (skipped for fast startup)
-        # self._discover_cameras() 
+        self._available_cameras = []  # Opened camera is seeded here before any scan
+        self._discovered = False      # Full scan runs lazily on first flip/list
+        self._opened_camera = None    # Last opened camera, merged into every scan result
+        self._discovery_lock = threading.Lock()  # One scan at a time
+        self._discovery_thread = None
+        self._busy = set()  # Indices held by a probe or open() - never both at once
+        self._busy_cond = threading.Condition()
+        self._small_buf = None  # Reused detection buffers (resized on shape change)
+        self._gray_buf = None
+        self._last_boxes = None  # Raw boxes from the last full detection
+        self._last_motion_gray = None
+        self._since_detect = 0
         
         if auto_open:
             try:
@@ -49,44 +97,138 @@ class CameraFaceCropper:
             except Exception as e:
                 logger.error(f"Failed to initialize camera: {str(e)}")
 
+    @classmethod
+    def _get_cascade(cls):
+        """Shared Haar cascade, loaded from bundled assets on first use"""
+        with cls._FACE_CASCADE_LOCK:
+            if cls._FACE_CASCADE is None:
+                cascade_path = resource_path(os.path.join("assets", "haarcascade_frontalface_default.xml"))
+                cascade = cv2.CascadeClassifier(cascade_path)
+                
+                if cascade.empty():
+                    logger.error(f"Failed to load cascade from: {cascade_path}")
+                    # Fallback to cv2.data as last resort (works in dev if assets invalid)
+                    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+                cls._FACE_CASCADE = cascade
+            return cls._FACE_CASCADE
+
+    def _load_face_net(self):
+        """Load the SSD face detector from assets, None if model files are missing"""
+        proto = resource_path(os.path.join("assets", DNN_PROTOTXT))
+        model = resource_path(os.path.join("assets", DNN_MODEL))
+        if not (os.path.exists(proto) and os.path.exists(model)):
+            logger.info("DNN face model not bundled, using Haar cascade")
+            return None
+        try:
+            net = cv2.dnn.readNetFromCaffe(proto, model)
+            net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+            logger.info("DNN face detector loaded")
+            return net
+        except Exception as e:
+            logger.warning(f"Failed to load DNN face detector, using Haar cascade: {e}")
+            return None
+
+    def _probe_camera(self, i: int) -> Optional[Dict]:
+        """Open camera index once, return its info if it delivers a frame"""
+        with self._busy_cond:
+            if i in self._busy or (self.cap is not None and i == self.cam_index):
+                return None  # Opened (or being opened) for real - open() records it
+            self._busy.add(i)
+        temp_cap = None
+        try:
+            temp_cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)
+            if not temp_cap.isOpened():
+                return None
+            temp_cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            ret, frame = temp_cap.read()
+            if not ret or frame is None:
+                return None
+            
+            # Get camera info
+            width = int(temp_cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(temp_cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            fps = temp_cap.get(cv2.CAP_PROP_FPS)
+            logger.info(f"Found camera {i}: {width}x{height} @ {fps}fps")
+            return {
+                'index': i,
+                'name': f'Camera {i}',
+                'resolution': f'{width}x{height}',
+                'fps': fps,
+                'working': True
+            }
+        except Exception as e:
+            logger.debug(f"Camera {i} not available: {str(e)}")
+            return None
+        finally:
+            if temp_cap is not None:
+                temp_cap.release()
+            with self._busy_cond:
+                self._busy.discard(i)
+                self._busy_cond.notify_all()
+
     def _discover_cameras(self):
-        """Discover all available cameras"""
-        self._available_cameras = []
-        
-        for i in range(10):  # Check cameras 0-9
-            try:
-                temp_cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)
-                if temp_cap.isOpened():
-                    ret, frame = temp_cap.read()
-                    if ret and frame is not None:
-                        # Get camera info
-                        width = int(temp_cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                        height = int(temp_cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                        fps = temp_cap.get(cv2.CAP_PROP_FPS)
-                        
-                        camera_info = {
-                            'index': i,
-                            'name': f'Camera {i}',
-                            'resolution': f'{width}x{height}',
-                            'fps': fps,
-                            'working': True
-                        }
-                        self._available_cameras.append(camera_info)
-                        logger.info(f"Found camera {i}: {width}x{height} @ {fps}fps")
-                    
-                    temp_cap.release()
-            except Exception as e:
-                logger.debug(f"Camera {i} not available: {str(e)}")
-                continue
-        
-        logger.info(f"Discovered {len(self._available_cameras)} available cameras")
+        """Discover all available cameras (indices 0-9 probed in parallel)"""
+        with self._discovery_lock:
+            # The opened camera can't be probed while we hold it (merged in below)
+            opened = self.cam_index if self.cap is not None else None
+            indices = [i for i in range(10) if i != opened]
+            
+            # Driver-bound blocking calls: wall time is the slowest probe, capped by
+            # DISCOVERY_TIMEOUT for the result
+            with ThreadPoolExecutor(max_workers=10, thread_name_prefix="camera-probe") as ex:
+                futures = [ex.submit(self._probe_camera, i) for i in indices]
+                done, _ = wait(futures, timeout=DISCOVERY_TIMEOUT)
+                found = [f.result() for f in futures if f in done and f.result()]
+                self._available_cameras = self._with_opened(found)
+                self._discovered = True
+                logger.info(f"Discovered {len(found)} available cameras")
+            # Leaving the executor waits for stragglers: the next scan starts only
+            # after every probe has released its device
+    
+    def _start_discovery(self):
+        """Scan on a background thread (no-op while a scan is running)"""
+        with self._busy_cond:
+            if self._discovery_thread is not None and self._discovery_thread.is_alive():
+                return
+            self._discovery_thread = threading.Thread(
+                target=self._discover_cameras, name="camera-discovery", daemon=True)
+            self._discovery_thread.start()
+
+    @property
+    def discovery_pending(self) -> bool:
+        """True until the first full scan has finished"""
+        return not self._discovered
 
     def get_available_cameras(self) -> List[Dict]:
-        """Get list of available cameras"""
-        if not self._available_cameras:
-            self._discover_cameras()
+        """Cameras known so far; starts a background scan if none ran yet (never blocks)"""
+        if not self._discovered:
+            self._start_discovery()
         return self._available_cameras.copy()
     
+    def refresh_cameras(self) -> List[Dict]:
+        """Forget discovered cameras and scan again in the background"""
+        self._discovered = False
+        return self.get_available_cameras()
+    
+    def _with_opened(self, cameras: List[Dict]) -> List[Dict]:
+        """`cameras` plus the opened camera (its probe fails while we hold the device)"""
+        opened = self._opened_camera
+        if opened is None or any(cam['index'] == opened['index'] for cam in cameras):
+            return cameras
+        return sorted(cameras + [opened], key=lambda cam: cam['index'])
+    
+    def _remember_camera(self, cam_index: int, width: int, height: int):
+        """Record the opened camera, before or after a full scan"""
+        self._opened_camera = {
+            'index': cam_index,
+            'name': f'Camera {cam_index}',
+            'resolution': f'{width}x{height}',
+            'fps': self.cap.get(cv2.CAP_PROP_FPS),
+            'working': True
+        }
+        self._available_cameras = self._with_opened(self._available_cameras)
+    
     def release(self):
         """Release camera resources"""
         with self._lock:
@@ -101,6 +243,19 @@ class CameraFaceCropper:
 
     def open(self, cam_index: int):
         """Open camera with improved error handling and validation"""
+        # Never race a discovery probe for the same device: wait for it, then hold it
+        with self._busy_cond:
+            self._busy_cond.wait_for(lambda: cam_index not in self._busy)
+            self._busy.add(cam_index)
+        try:
+            self._open(cam_index)
+        finally:
+            with self._busy_cond:
+                self._busy.discard(cam_index)
+                self._busy_cond.notify_all()
+
+    def _open(self, cam_index: int):
+        """open() body, called while cam_index is reserved against probes"""
         with self._lock:
             self.cam_index = cam_index
             
@@ -124,6 +279,12 @@ class CameraFaceCropper:
             if not self.cap.isOpened():
                 raise RuntimeError(f"Failed to open camera {cam_index}")
             
+            # Compressed stream + 1-frame driver queue: newest frame, less USB bandwidth
+            # (best effort - drivers that don't support a property ignore it)
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            self.cap.set(cv2.CAP_PROP_FPS, 30)
+            
             # Test if camera can read frames
             try:
                 ret, test_frame = self.cap.read()
@@ -136,6 +297,7 @@ class CameraFaceCropper:
                     logger.warning(f"Camera {cam_index} has low resolution: {width}x{height}")
                 
                 logger.info(f"Camera {cam_index} opened successfully: {width}x{height}")
+                self._remember_camera(cam_index, width, height)
                 
             except Exception as e:
                 self.cap.release()
@@ -144,16 +306,16 @@ class CameraFaceCropper:
 
     def flip_next(self, max_index=4):
         """Switch to next available camera"""
-        # Lazy discovery if not yet done
-        if not self._available_cameras:
-            self._discover_cameras()
-            
-        available_indices = [cam['index'] for cam in self._available_cameras]
+        available_indices = [cam['index'] for cam in self.get_available_cameras()]
         
         if not available_indices:
             logger.error("No available cameras to flip to")
             return self.cam_index
         
+        if self.discovery_pending and available_indices == [self.cam_index]:
+            logger.info("Camera scan still running, staying on current camera")
+            return self.cam_index
+        
         # Find next camera in available list
         current_idx = self.cam_index
         next_idx = None
@@ -225,8 +387,11 @@ class CameraFaceCropper:
 
 
     
-    def find_all_faces(self, frame_bgr, max_faces: int = 5, pad: float = 0.15):
-        """Find all faces in frame, return list sorted left-to-right with queue IDs"""
+    def find_all_faces(self, frame_bgr, max_faces: int = 5, pad: float = 0.15, copy: bool = True):
+        """Find all faces in frame, return list sorted left-to-right with queue IDs
+
+        copy=False returns crops as views into frame_bgr (valid until it is drawn on)
+        """
         if frame_bgr is None:
             return []
         
@@ -235,37 +400,36 @@ class CameraFaceCropper:
             if h < 100 or w < 100:
                 return []
             
-            gray = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY)
-            
-            faces = self.face_cascade.detectMultiScale(
-                gray,
-                scaleFactor=1.05,
-                minNeighbors=5,
-                minSize=(50, 50)
-            )
+            motion_gray = cv2.cvtColor(
+                cv2.resize(frame_bgr, MOTION_SIZE, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+            if self._can_reuse_boxes(motion_gray):
+                self._since_detect += 1
+                faces = self._last_boxes
+            else:
+                if self.face_net is not None:
+                    faces = self._detect_dnn(frame_bgr)
+                else:
+                    faces = self._detect_haar(frame_bgr)
+                self._last_boxes = list(faces)
+                self._last_motion_gray = motion_gray
+                self._since_detect = 0
             
             if len(faces) == 0:
                 return []
             
             # Sort by x position (left to right) for queue order
-            faces = sorted(faces, key=lambda f: f[0])
-            faces = faces[:max_faces]
+            boxes = np.asarray(faces, dtype=np.int32).reshape(-1, 4)
+            boxes = boxes[np.argsort(boxes[:, 0], kind="stable")][:max_faces]
             
             results = []
-            for i, (x, y, bw, bh) in enumerate(faces):
-                # Apply padding
-                px = int(bw * pad)
-                py = int(bh * pad)
-                x1 = max(0, x - px)
-                y1 = max(0, y - py)
-                x2 = min(w, x + bw + px)
-                y2 = min(h, y + bh + py)
-                
+            for i, (x1, y1, x2, y2) in enumerate(_pad_clip(boxes, w, h, pad).tolist()):
                 if x2 <= x1 or y2 <= y1:
                     continue
                 
-                crop = frame_bgr[y1:y2, x1:x2].copy()
-                if crop is None or crop.size == 0:
+                crop = frame_bgr[y1:y2, x1:x2]
+                if copy:
+                    crop = crop.copy()
+                if crop.size == 0:
                     continue
                 
                 results.append({
@@ -280,6 +444,61 @@ class CameraFaceCropper:
             logger.error(f"Error in multi-face detection: {e}")
             return []
 
+    def _can_reuse_boxes(self, motion_gray) -> bool:
+        """Previous boxes still valid: within DETECT_EVERY and the scene barely moved"""
+        if self._last_boxes is None or self._since_detect >= DETECT_EVERY - 1:
+            return False
+        if self._last_motion_gray.shape != motion_gray.shape:
+            return False
+        return cv2.absdiff(motion_gray, self._last_motion_gray).mean() < MOTION_THRESHOLD
+    
+    def _detect_haar(self, frame_bgr) -> List[Tuple[int, int, int, int]]:
+        """Haar cascade on the downscaled gray frame, boxes in full-res (x, y, w, h)"""
+        gray, scale = self._detection_gray(frame_bgr)
+        min_side = max(20, int(50 * scale))
+        
+        faces = self.face_cascade.detectMultiScale(
+            gray,
+            scaleFactor=HAAR_SCALE_FACTOR,
+            minNeighbors=HAAR_MIN_NEIGHBORS,
+            minSize=(min_side, min_side)
+        )
+        
+        inv = 1.0 / scale
+        return [tuple(int(v * inv) for v in face) for face in faces]
+    
+    def _detect_dnn(self, frame_bgr) -> List[Tuple[int, int, int, int]]:
+        """SSD face detector at 300x300, boxes in full-res (x, y, w, h)"""
+        h, w = frame_bgr.shape[:2]
+        blob = cv2.dnn.blobFromImage(frame_bgr, 1.0, DNN_INPUT_SIZE, DNN_MEAN)
+        self.face_net.setInput(blob)
+        detections = self.face_net.forward()[0, 0]  # (N, 7): _, _, conf, x1, y1, x2, y2
+        
+        faces = []
+        for det in detections[detections[:, 2] > DNN_CONFIDENCE]:
+            x1, y1 = int(det[3] * w), int(det[4] * h)
+            x2, y2 = int(det[5] * w), int(det[6] * h)
+            if x2 - x1 >= 20 and y2 - y1 >= 20:
+                faces.append((x1, y1, x2 - x1, y2 - y1))
+        return faces
+    
+    def _detection_gray(self, frame_bgr):
+        """Grayscale frame downscaled to DETECT_WIDTH, plus the scale applied"""
+        h, w = frame_bgr.shape[:2]
+        if w <= DETECT_WIDTH:
+            scale, small = 1.0, frame_bgr
+        else:
+            scale = DETECT_WIDTH / w
+            size = (DETECT_WIDTH, int(round(h * scale)))
+            if self._small_buf is None or self._small_buf.shape[:2] != (size[1], size[0]):
+                self._small_buf = np.empty((size[1], size[0], 3), dtype=np.uint8)
+            small = cv2.resize(frame_bgr, size, dst=self._small_buf, interpolation=cv2.INTER_AREA)
+        
+        if self._gray_buf is None or self._gray_buf.shape != small.shape[:2]:
+            self._gray_buf = np.empty(small.shape[:2], dtype=np.uint8)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=self._gray_buf)
+        return gray, scale
+
     def capture_photo(self, save_path: Optional[str] = None) -> Optional[np.ndarray]:
         """Capture a single photo from camera"""
         frame = self.read_frame()
@@ -313,13 +532,20 @@ class CameraFaceCropper:
                 logger.warning(f"Image too small for JPEG encoding: {w}x{h}")
                 return None
             
-            ok, buf = cv2.imencode(".jpg", img_bgr, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
-            
-            if not ok or buf is None:
-                logger.error("Failed to encode image to JPEG")
-                return None
-            
-            jpg_bytes = buf.tobytes()
+            if _turbo is not None:
+                # SIMD encoder, 4:2:0 (input is BGR, TurboJPEG's default); fast DCT only
+                # for recognition-grade quality, enrollment captures keep the accurate DCT
+                flags = TJFLAG_FASTDCT if quality < FAST_DCT_MAX_QUALITY else 0
+                jpg_bytes = _turbo.encode(img_bgr, quality=quality,
+                                          jpeg_subsample=TJSAMP_420, flags=flags)
+            else:
+                ok, buf = cv2.imencode(".jpg", img_bgr, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+                
+                if not ok or buf is None:
+                    logger.error("Failed to encode image to JPEG")
+                    return None
+                
+                jpg_bytes = buf.tobytes()
             
             # Validate encoded data
             if len(jpg_bytes) == 0:
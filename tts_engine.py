@@ -16,6 +16,10 @@ logger = get_logger("tts")
 # Cache directory
 CACHE_DIR = Path("tts_cache")
 CACHE_DIR.mkdir(exist_ok=True)
+CACHE_MAX_FILES = 200  # LRU cap on cached mp3 files
+
+# Parallel edge-tts syntheses during preload (one thread, one event loop)
+PRELOAD_CONCURRENCY = 4
 
 
 @dataclass
@@ -38,6 +42,7 @@ class TTSEngine:
         self._pyttsx_engine = None
         self._mixer_ready = False
         self._edge_available = True
+        self._preload_lock = threading.Lock()
         
         self._init_mixer()
         self._init_mixer()
@@ -85,6 +90,10 @@ class TTSEngine:
         # Try cache first
         if cache_path.exists() and cache_path.stat().st_size > 1000:
             logger.debug(f"Playing from cache")
+            try:
+                os.utime(cache_path)  # Mark as recently used for LRU pruning
+            except OSError:
+                pass
             if self._play_audio(cache_path):
                 return
         
@@ -153,24 +162,60 @@ class TTSEngine:
             "Halo {name}, mohon tunggu sebentar.",
         ]
         
+        texts = list(dict.fromkeys(
+            template.format(name=name)
+            for name in names[:5]  # Limit to first 5 names
+            for template in templates
+        ))
+        
+        # Single preload worker - repeated calls while one runs are dropped
+        if not self._preload_lock.acquire(blocking=False):
+            logger.debug("Preload already running, skipped")
+            return
+        
         def _preload():
-            count = 0
-            for name in names[:5]:  # Limit to first 5 names
-                for template in templates:
-                    text = template.format(name=name)
-                    cache_path = self._get_cache_path(text)
-                    if not cache_path.exists():
-                        try:
-                            asyncio.run(self._generate_edge_tts(text, cache_path))
-                            count += 1
-                            time.sleep(0.5)  # Rate limit delay
-                        except Exception as e:
-                            logger.warning(f"Preload warning: {e}")
-                            
-            if count > 0:
-                logger.info(f"Preloaded {count} audio files")
+            try:
+                pending = [t for t in texts if not self._get_cache_path(t).exists()]
+                if not pending:
+                    return
+                count = asyncio.run(self._preload_async(pending))
+                if count > 0:
+                    logger.info(f"Preloaded {count} audio files")
+                self._prune_cache()
+            except Exception as e:
+                logger.warning(f"Preload warning: {e}")
+            finally:
+                self._preload_lock.release()
         
         threading.Thread(target=_preload, daemon=True).start()
+    
+    async def _preload_async(self, texts: list[str]) -> int:
+        """Synthesize texts with at most PRELOAD_CONCURRENCY requests in flight"""
+        sem = asyncio.Semaphore(PRELOAD_CONCURRENCY)
+        
+        async def _one(text: str) -> bool:
+            async with sem:
+                cache_path = self._get_cache_path(text)
+                tmp_path = cache_path.with_suffix(".part")
+                try:
+                    await self._generate_edge_tts(text, tmp_path)
+                    os.replace(tmp_path, cache_path)  # Never expose a half-written mp3
+                    return True
+                except Exception as e:
+                    logger.warning(f"Preload warning: {e}")
+                    return False
+        
+        results = await asyncio.gather(*(_one(t) for t in texts))
+        return sum(results)
+    
+    def _prune_cache(self, max_files: int = CACHE_MAX_FILES):
+        """Delete least recently used cache files beyond max_files"""
+        try:
+            files = sorted(CACHE_DIR.glob("tts_*.mp3"), key=lambda p: p.stat().st_mtime, reverse=True)
+            for path in files[max_files:]:
+                path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Cache prune failed: {e}")
 
     def cleanup(self):
         """Cleanup resources"""
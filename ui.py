@@ -1,5 +1,6 @@
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 def resource_path(relative_path):
     """ Get absolute path to resource, works for dev and for PyInstaller """
@@ -20,12 +21,12 @@ def resource_path(relative_path):
 from PySide6.QtWidgets import (
     QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QTabWidget,
     QLineEdit, QFormLayout, QMessageBox, QListWidget, QListWidgetItem,
-    QTableWidget, QTableWidgetItem, QFileDialog, QSpinBox, QComboBox,
+    QTableView, QAbstractItemView, QFileDialog, QSpinBox, QComboBox,
     QProgressBar, QDialog, QDialogButtonBox, QGridLayout, QGroupBox,
     QFrame, QScrollArea, QSizePolicy
 )
 from PySide6.QtCore import Qt, Signal, QPropertyAnimation, QEasingCurve, QRect, QVariantAnimation
-from PySide6.QtGui import QPixmap, QFont, QColor
+from PySide6.QtGui import QPixmap, QFont, QColor, QStandardItemModel
 from PySide6.QtWidgets import QGraphicsDropShadowEffect, QGraphicsOpacityEffect
 from ui_components import AnimatedButton, HoverCard
 
@@ -118,13 +119,13 @@ QListWidget::item:hover {{
     background: {COLORS['surface_light']};
 }}
 
-QTableWidget {{
+QTableView {{
     background: {COLORS['surface']};
     border: 1px solid {COLORS['border']};
     border-radius: 8px;
     gridline-color: {COLORS['border']};
 }}
-QTableWidget::item {{
+QTableView::item {{
     padding: 8px;
 }}
 QHeaderView::section {{
@@ -302,7 +303,7 @@ class StatCard(QFrame):
 class CameraCaptureDialog(QDialog):
     """Dialog for capturing face photos via camera"""
     
-    def __init__(self, parent=None, person_name=""):
+    def __init__(self, parent=None, person_name="", encoder=None):
         super().__init__(parent)
         self.setWindowTitle(f"📷 Capture Wajah - {person_name}")
         self.setMinimumSize(700, 500)
@@ -310,6 +311,10 @@ class CameraCaptureDialog(QDialog):
         
         self.person_name = person_name
         self.captured_images = []
+        # Optional frame -> JPEG bytes encoder, run off the GUI thread per capture
+        self._encoder = encoder
+        self._encode_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="enroll-encode") if encoder else None
+        self._encoded = []
         self.camera = None
         self.timer = None
         
@@ -411,6 +416,8 @@ class CameraCaptureDialog(QDialog):
             import cv2
             frame = self._current_frame.copy()
             self.captured_images.append(frame)
+            if self._encode_pool is not None:
+                self._encoded.append(self._encode_pool.submit(self._encoder, frame))
             
             # Update thumbnail
             idx = len(self.captured_images) - 1
@@ -431,11 +438,21 @@ class CameraCaptureDialog(QDialog):
     def get_captured_images(self):
         return self.captured_images
     
+    def get_captured_jpegs(self):
+        """Encoded captures (needs `encoder`), waits for any still encoding"""
+        if self._encode_pool is None:
+            return []
+        jpgs = [f.result() for f in self._encoded]
+        self._encode_pool.shutdown(wait=False)
+        return [b for b in jpgs if b]
+    
     def closeEvent(self, event):
         if self.timer:
             self.timer.stop()
         if self.camera:
             self.camera.release()
+        if self._encode_pool is not None:
+            self._encode_pool.shutdown(wait=False)
         super().closeEvent(event)
 
 
@@ -796,8 +813,7 @@ class MainUI(QWidget):
         filter_layout.addStretch()
         
         # Events table
-        self.ev_table = QTableWidget(0, 8)
-        self.ev_table.setHorizontalHeaderLabels(["ID", "Day", "Time", "Device", "Name", "Type", "Status", "Distance"])
+        self.ev_table = self._create_table(["ID", "Day", "Time", "Device", "Name", "Type", "Status", "Distance"])
         self.ev_table.horizontalHeader().setStretchLastSection(True)
         
         # Correction section
@@ -828,6 +844,16 @@ class MainUI(QWidget):
         
         return tab
     
+    def _create_table(self, headers: list) -> QTableView:
+        """Read-only table view; rows arrive as a fresh model (see app._fill_table)"""
+        model = QStandardItemModel(0, len(headers))
+        model.setHorizontalHeaderLabels(headers)
+        table = QTableView()
+        table.setModel(model)
+        model.setParent(table)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        return table
+    
     def _create_reports_tab(self) -> QWidget:
         """Create reports tab"""
         tab = QWidget()
@@ -853,8 +879,7 @@ class MainUI(QWidget):
         month_layout.addStretch()
         
         # Report table
-        self.report_table = QTableWidget(0, 4)
-        self.report_table.setHorizontalHeaderLabels(["Nama", "Hari Hadir", "Terlambat", "Missing Out"])
+        self.report_table = self._create_table(["Nama", "Hari Hadir", "Terlambat", "Missing Out"])
         self.report_table.horizontalHeader().setStretchLastSection(True)
         
         layout.addLayout(month_layout)
@@ -901,8 +926,12 @@ class MainUI(QWidget):
         self.device_id = QLineEdit()
         self.device_id.setPlaceholderText("Device ID")
         
+        self.btn_save_settings = QPushButton("💾 Simpan")
+        self.btn_save_settings.setMinimumWidth(120)
+        
         api_layout.addRow("API URL:", self.api_url)
         api_layout.addRow("Device ID:", self.device_id)
+        api_layout.addRow("", self.btn_save_settings)
         
         layout.addWidget(login_group)
         layout.addWidget(api_group)
@@ -911,6 +940,12 @@ class MainUI(QWidget):
         return tab
     
     # UI Helper Methods
+    def show_logged_out(self):
+        """Reset the admin login status (token was dropped)"""
+        self.in_pass.clear()
+        self.lbl_login.setText("Belum login")
+        self.lbl_login.setStyleSheet(f"color: {COLORS['text_muted']};")
+    
     def set_badge(self, text: str, kind: str):
         """Update status badge"""
         colors = {